@@ -27,13 +27,36 @@ Usage:
     python run.py --verify --evidence # Full verification
     python run.py --mode localstack  # Verify LocalStack setup
     python run.py --mode aws         # Verify Real AWS setup
+    python run.py --verify --sandbox # Isolated, parallel-safe verification
+    python run.py --history          # Show recorded results over time
+    python run.py --discover         # Print terraform import commands
+    python run.py --serve            # Run as a local HTTP grading service
 """
 
 import os
 import re
+import io
 import sys
+import json
+import time
+import shlex
+import signal
+import tarfile
+import contextlib
+import functools
+import threading
+import uuid
+import sqlite3
+import shutil
+import tempfile
 import subprocess
 import argparse
+import multiprocessing
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from pathlib import Path
 
 # ANSI colors
@@ -55,15 +78,21 @@ def print_header(text):
 def print_section(text):
     print(f"\n{BOLD}{CYAN}▶ {text}{RESET}")
     print("-" * 50)
+    if RECORDER is not None:
+        RECORDER.start_section(text)
 
 
 def check_passed(message):
     print(f"  {GREEN}✓{RESET} {message}")
+    if RECORDER is not None:
+        RECORDER.record(message, True)
     return True
 
 
 def check_failed(message, hint=""):
     print(f"  {RED}✗{RESET} {message}")
+    if RECORDER is not None:
+        RECORDER.record(message, False, hint)
     if hint:
         print(f"    {YELLOW}↳ Hint: {hint}{RESET}")
     return False
@@ -78,67 +107,272 @@ def check_file_exists(filepath):
     return os.path.exists(filepath)
 
 
-def check_file_contains(filepath, pattern, is_regex=False):
-    """Check if a file contains a pattern (ignoring comments)."""
-    if not os.path.exists(filepath):
-        return False
+def _read_for_matching(filepath):
+    """Read a file for pattern matching, or None if it can't be read.
+
+    Commented lines are dropped from Terraform files so that templates with
+    commented-out examples don't count as configured.
+    """
     try:
         with open(filepath, 'r', encoding='utf-8') as f:
             content = f.read()
-            # Skip commented lines for terraform files
-            if filepath.endswith('.tf'):
-                lines = content.split('\n')
-                uncommented = '\n'.join(
-                    line for line in lines
-                    if not line.strip().startswith('#')
-                )
-                content = uncommented
-            if is_regex:
-                return bool(re.search(pattern, content))
-            return pattern in content
     except Exception:
-        return False
+        return None
+    # Skip commented lines for terraform files
+    if filepath.endswith('.tf'):
+        lines = content.split('\n')
+        content = '\n'.join(
+            line for line in lines
+            if not line.strip().startswith('#')
+        )
+    return content
+
 
+# =============================================================================
+# COMMAND EXECUTION
+# =============================================================================
 
-def run_command(cmd, cwd=None, timeout=60):
-    """Run a command and return (success, output)."""
+# Output fragments that indicate a failure worth retrying (LocalStack hiccups,
+# throttling, network blips). Matched case-insensitively.
+TRANSIENT_ERROR_PATTERNS = [
+    "connection refused",
+    "connection reset",
+    "could not connect to the endpoint",
+    "connect timeout",
+    "read timeout",
+    "temporarily unavailable",
+    "service unavailable",
+    "throttling",
+    "slowdown",
+    "requestlimitexceeded",
+    "internalerror",
+    "status code: 503",
+]
+
+# Output fragments that indicate another process holds the Terraform state lock.
+LOCK_CONTENTION_PATTERNS = [
+    "error acquiring the state lock",
+    "state is locked",
+    "conditionalcheckfailedexception",
+    "lock info:",
+]
+
+# Set to cancel every in-flight and future command (see cancel_all_commands)
+CANCEL_EVENT = threading.Event()
+
+_active_processes = set()
+_active_lock = threading.Lock()
+
+
+def is_lock_contention(output):
+    """Check if command output shows a Terraform state lock conflict."""
+    lowered = output.lower()
+    return any(p in lowered for p in LOCK_CONTENTION_PATTERNS)
+
+
+def is_transient_error(output):
+    """Check if command output looks like a transient, retryable failure."""
+    lowered = output.lower()
+    return is_lock_contention(output) or \
+        any(p in lowered for p in TRANSIENT_ERROR_PATTERNS)
+
+
+def _kill_process_tree(proc):
+    """Kill a process and every child it spawned."""
     try:
-        result = subprocess.run(
-            cmd,
-            shell=True,
-            cwd=cwd,
-            capture_output=True,
-            text=True,
-            timeout=timeout
-        )
-        return result.returncode == 0, result.stdout + result.stderr
-    except subprocess.TimeoutExpired:
-        return False, "Command timed out"
-    except Exception as e:
-        return False, str(e)
+        if os.name == "posix":
+            # The session outlives its leader while background children
+            # remain, so this also reaches orphans of an exited command
+            os.killpg(proc.pid, signal.SIGKILL)
+        elif proc.poll() is None:
+            # /T kills the whole tree on Windows
+            subprocess.run(["taskkill", "/F", "/T", "/PID", str(proc.pid)],
+                           capture_output=True)
+    except (ProcessLookupError, PermissionError, OSError):
+        pass
+    try:
+        proc.kill()
+    except OSError:
+        pass
+
+
+def cancel_all_commands():
+    """Cancel every in-flight command and make new ones fail immediately."""
+    CANCEL_EVENT.set()
+    with _active_lock:
+        procs = list(_active_processes)
+    for proc in procs:
+        _kill_process_tree(proc)
+
+
+def reset_cancellation():
+    """Allow commands to run again after cancel_all_commands()."""
+    CANCEL_EVENT.clear()
+
+
+def _run_once(argv, cwd, timeout, env, merge_stderr=True):
+    """Run argv once in its own process group.
+
+    Returns (returncode, stdout, stderr); stderr is folded into stdout (and
+    returned empty) when merge_stderr is set.
+    """
+    popen_kwargs = {}
+    if os.name == "posix":
+        popen_kwargs["start_new_session"] = True
+    else:
+        popen_kwargs["creationflags"] = subprocess.CREATE_NEW_PROCESS_GROUP
+
+    proc = subprocess.Popen(
+        argv,
+        cwd=cwd,
+        env=env,
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT if merge_stderr else subprocess.PIPE,
+        text=True,
+        **popen_kwargs
+    )
+    with _active_lock:
+        _active_processes.add(proc)
+
+    streams = [proc.stdout] + ([] if merge_stderr else [proc.stderr])
+    chunks = [[] for _ in streams]
+    readers = [threading.Thread(target=lambda s=stream, c=chunk: c.append(s.read()),
+                                daemon=True)
+               for stream, chunk in zip(streams, chunks)]
+    for reader in readers:
+        reader.start()
+    deadline = time.monotonic() + timeout
+    try:
+        while proc.poll() is None:
+            if CANCEL_EVENT.is_set():
+                _kill_process_tree(proc)
+                return None, "Command cancelled", ""
+            if time.monotonic() >= deadline:
+                _kill_process_tree(proc)
+                return None, "Command timed out", ""
+            time.sleep(0.05)
+        if proc.returncode != 0 and CANCEL_EVENT.is_set():
+            # Killed by cancel_all_commands() from another thread
+            return None, "Command cancelled", ""
+        # A background grandchild can keep stdout open after the command
+        # itself exits; it still counts against the timeout
+        for reader in readers:
+            reader.join(max(0, deadline - time.monotonic()))
+        if any(reader.is_alive() for reader in readers):
+            _kill_process_tree(proc)
+            return None, "Command timed out", ""
+        output = ["".join(chunk) for chunk in chunks] + [""]
+        return proc.returncode, output[0], output[1]
+    finally:
+        # Always reap the whole session: Ctrl+C only reaches us (the child
+        # has its own session), and leftover background children would
+        # otherwise outlive the command - and keep holding state locks
+        _kill_process_tree(proc)
+        with _active_lock:
+            _active_processes.discard(proc)
+        for reader in readers:
+            reader.join(timeout=1)
+        for stream in streams:
+            stream.close()
+        proc.wait()
+
+
+def run_command(cmd, cwd=None, timeout=60, retries=2, backoff=1.0,
+                lock_retries=5, env=None, merge_stderr=True):
+    """Run a command and return (success, output).
+
+    cmd is an argv list (a string is split with shlex; no shell is used).
+    Transient failures are retried up to `retries` times and state lock
+    conflicts up to `lock_retries` times, with exponential backoff. On
+    timeout the whole process group is killed.
+
+    With merge_stderr=False a successful command's output is its stdout
+    alone (for parsing JSON); failures still include stderr.
+    """
+    argv = shlex.split(cmd) if isinstance(cmd, str) else list(cmd)
+    attempt = 0
+    lock_attempt = 0
+    delay = backoff
+
+    while True:
+        if CANCEL_EVENT.is_set():
+            return False, "Command cancelled"
+        try:
+            returncode, output, errors = _run_once(argv, cwd, timeout, env,
+                                                   merge_stderr)
+        except FileNotFoundError:
+            return False, f"Command not found: {argv[0]}"
+        except Exception as e:
+            return False, str(e)
+
+        if returncode == 0:
+            return True, output
+        output += errors
+        if returncode is None:
+            # Timed out or cancelled - retrying would only burn more time
+            return False, output
+
+        if is_lock_contention(output) and lock_attempt < lock_retries:
+            lock_attempt += 1
+        elif is_transient_error(output) and attempt < retries:
+            attempt += 1
+        else:
+            return False, output
+
+        # Back off, but wake immediately if everything gets cancelled
+        if CANCEL_EVENT.wait(delay):
+            return False, "Command cancelled"
+        delay = min(delay * 2, 30)
+
+
+PROBE_TTL = 60
+_probe_cache = {}
 
 
+def cached_probe(func):
+    """Reuse an environment probe's answer for PROBE_TTL seconds.
+
+    Probes shell out to terraform/docker/aws; the grading service runs many
+    jobs per process, and a single run asks whether LocalStack is up twice.
+    """
+    @functools.wraps(func)
+    def wrapper():
+        cached = _probe_cache.get(func.__name__)
+        if cached and time.monotonic() - cached[0] < PROBE_TTL:
+            return cached[1]
+        result = func()
+        _probe_cache[func.__name__] = (time.monotonic(), result)
+        return result
+    return wrapper
+
+
+@cached_probe
 def check_terraform_installed():
     """Check if Terraform CLI is installed."""
-    success, output = run_command("terraform version")
+    success, output = run_command(["terraform", "version"])
     return success
 
 
+@cached_probe
 def check_aws_configured():
     """Check if AWS CLI is configured."""
-    success, output = run_command("aws sts get-caller-identity")
+    success, output = run_command(["aws", "sts", "get-caller-identity"])
     return success
 
 
+@cached_probe
 def check_docker_running():
     """Check if Docker is running."""
-    success, output = run_command("docker ps")
+    success, output = run_command(["docker", "ps"])
     return success
 
 
+@cached_probe
 def check_localstack_running():
     """Check if LocalStack is running."""
-    success, output = run_command("docker ps --filter name=localstack --format '{{.Names}}'")
+    success, output = run_command(["docker", "ps", "--filter", "name=localstack",
+                                   "--format", "{{.Names}}"], retries=0)
     return success and "localstack" in output.lower()
 
 
@@ -146,246 +380,752 @@ def check_localstack_running():
 # FILE-BASED CHECKS
 # =============================================================================
 
-def grade_scenario_1_files():
-    """Grade Scenario 1: Local to Remote - File checks only."""
-    print_section("Scenario 1: Local to Remote Migration (Files)")
-
-    checks = []
-    base = "scenario-1-local-to-remote"
-
-    # Check backend.tf exists
-    if check_file_exists(f'{base}/backend.tf'):
-        checks.append(check_passed("backend.tf exists"))
-    else:
-        checks.append(check_failed("backend.tf exists",
-            "Create backend.tf with S3 backend configuration"))
-        return checks
-
-    # Check S3 backend configured
-    if check_file_contains(f'{base}/backend.tf', 'backend "s3"'):
-        checks.append(check_passed("S3 backend configured"))
-    else:
-        checks.append(check_failed("S3 backend configured",
-            "Add: terraform { backend \"s3\" { ... } }"))
-
-    # Check bucket specified
-    if check_file_contains(f'{base}/backend.tf', 'bucket'):
-        checks.append(check_passed("Bucket specified in backend"))
-    else:
-        checks.append(check_failed("Bucket specified",
-            "Add: bucket = \"your-bucket-name\""))
-
-    # Check key specified
-    if check_file_contains(f'{base}/backend.tf', 'key'):
-        checks.append(check_passed("Key (state path) specified"))
-    else:
-        checks.append(check_failed("Key specified",
-            "Add: key = \"path/to/terraform.tfstate\""))
-
-    # Check region specified
-    if check_file_contains(f'{base}/backend.tf', 'region'):
-        checks.append(check_passed("Region specified"))
-    else:
-        checks.append(check_failed("Region specified",
-            "Add: region = \"us-east-1\""))
-
-    # Check create-bucket.sh exists
-    if check_file_exists(f'{base}/create-bucket.sh'):
-        checks.append(check_passed("create-bucket.sh exists"))
-    else:
-        checks.append(check_failed("create-bucket.sh exists",
-            "Create script to create the S3 bucket"))
-
-    return checks
-
+# Declarative file checks, one entry per scenario. Each check lists:
+#   id        - unique within the scenario, used by "requires"
+#   test      - predicate tuple, paths relative to the scenario base:
+#                 ("exists", path)
+#                 ("any_exists", path, path, ...)
+#                 ("all_exists", path, path, ...)
+#                 ("contains", path, pattern)
+#   name      - message shown on pass (and on fail unless "fail" is given)
+#   fail      - optional message shown on fail
+#   hint      - optional hint shown on fail
+#   requires  - ids that must pass first, otherwise the check is skipped
+#   gate      - if it fails, every later check in the scenario is skipped
+#   fail_info - on fail, print this as info and don't count the check
+#   info      - bonus check: printed as info on pass, never counted
+FILE_CHECKS = [
+    {
+        "scenario": "1",
+        "title": "Scenario 1: Local to Remote Migration (Files)",
+        "base": "scenario-1-local-to-remote",
+        "checks": [
+            {"id": "backend", "test": ("exists", "backend.tf"),
+             "name": "backend.tf exists", "gate": True,
+             "hint": "Create backend.tf with S3 backend configuration"},
+            {"id": "s3", "test": ("contains", "backend.tf", 'backend "s3"'),
+             "name": "S3 backend configured",
+             "hint": "Add: terraform { backend \"s3\" { ... } }"},
+            {"id": "bucket", "test": ("contains", "backend.tf", "bucket"),
+             "name": "Bucket specified in backend", "fail": "Bucket specified",
+             "hint": "Add: bucket = \"your-bucket-name\""},
+            {"id": "key", "test": ("contains", "backend.tf", "key"),
+             "name": "Key (state path) specified", "fail": "Key specified",
+             "hint": "Add: key = \"path/to/terraform.tfstate\""},
+            {"id": "region", "test": ("contains", "backend.tf", "region"),
+             "name": "Region specified",
+             "hint": "Add: region = \"us-east-1\""},
+            {"id": "script", "test": ("exists", "create-bucket.sh"),
+             "name": "create-bucket.sh exists",
+             "hint": "Create script to create the S3 bucket"},
+        ],
+    },
+    {
+        "scenario": "2",
+        "title": "Scenario 2: Import Existing Resources (Files)",
+        "base": "scenario-2-import",
+        "checks": [
+            {"id": "main", "test": ("exists", "main.tf"),
+             "name": "main.tf exists", "gate": True},
+            {"id": "instance",
+             "test": ("contains", "main.tf", 'resource "aws_instance"'),
+             "name": "aws_instance resource defined",
+             "hint": "Add: resource \"aws_instance\" \"imported\" { ... }"},
+            {"id": "named", "test": ("contains", "main.tf", "imported"),
+             "name": "Resource named 'imported'",
+             "hint": "Name your resource: aws_instance.imported"},
+            {"id": "script", "test": ("exists", "setup.sh"),
+             "name": "setup.sh exists"},
+        ],
+    },
+    {
+        "scenario": "3",
+        "title": "Scenario 3: Move Resources Between States (Files)",
+        "base": "scenario-3-move",
+        "checks": [
+            {"id": "old", "test": ("exists", "old-project/main.tf"),
+             "name": "old-project/main.tf exists"},
+            {"id": "new", "test": ("exists", "new-project/main.tf"),
+             "name": "new-project/main.tf exists"},
+            {"id": "old_instance",
+             "test": ("contains", "old-project/main.tf", "aws_instance"),
+             "name": "old-project has aws_instance"},
+            {"id": "script", "test": ("exists", "move-resources.sh"),
+             "name": "move-resources.sh exists",
+             "hint": "Create script with terraform state mv commands"},
+        ],
+    },
+    {
+        "scenario": "4",
+        "title": "Scenario 4: Backend Migration (Files)",
+        "base": "scenario-4-backend-migration",
+        "checks": [
+            {"id": "main", "test": ("exists", "main.tf"),
+             "name": "main.tf exists", "gate": True},
+            {"id": "backend_a",
+             "test": ("any_exists", "backend-a.tf", "backend-a.tf.bak"),
+             "name": "backend-a.tf exists",
+             "hint": "Create backend-a.tf with source S3 bucket"},
+            {"id": "backend_b",
+             "test": ("any_exists", "backend-b.tf", "backend-b.tf.example"),
+             "name": "backend-b.tf exists",
+             "hint": "Create backend-b.tf with target S3 bucket"},
+            {"id": "script",
+             "test": ("any_exists", "create-buckets.sh", "create-buckets.ps1"),
+             "name": "create-buckets script exists"},
+            {"id": "migrated",
+             "test": ("all_exists", "backend-b.tf", "backend-a.tf.bak"),
+             "name": "Migration completed (backend files swapped)",
+             "fail_info": "Migration not yet completed (backend-b.tf not active)"},
+        ],
+    },
+    {
+        "scenario": "5",
+        "title": "Scenario 5: State Recovery (Files)",
+        "base": "scenario-5-state-recovery",
+        "checks": [
+            {"id": "main", "test": ("exists", "main.tf"),
+             "name": "main.tf exists", "gate": True},
+            {"id": "instance", "test": ("contains", "main.tf", "aws_instance"),
+             "name": "aws_instance resource defined"},
+            {"id": "sg", "test": ("contains", "main.tf", "aws_security_group"),
+             "name": "aws_security_group resource defined"},
+            {"id": "volume", "test": ("contains", "main.tf", "aws_ebs_volume"),
+             "name": "aws_ebs_volume resource defined"},
+            {"id": "script",
+             "test": ("any_exists", "simulate-disaster.sh",
+                      "simulate-disaster.ps1"),
+             "name": "simulate-disaster script exists"},
+            {"id": "state", "test": ("exists", "terraform.tfstate"),
+             "name": "State file recovered (terraform.tfstate exists)",
+             "fail_info": "State not yet recovered (run terraform import commands)"},
+            {"id": "state_instance", "requires": ["state"], "info": True,
+             "test": ("contains", "terraform.tfstate", "aws_instance.web"),
+             "name": "  State contains aws_instance.web"},
+            {"id": "state_sg", "requires": ["state"], "info": True,
+             "test": ("contains", "terraform.tfstate", "aws_security_group.web"),
+             "name": "  State contains aws_security_group.web"},
+            {"id": "state_volume", "requires": ["state"], "info": True,
+             "test": ("contains", "terraform.tfstate", "aws_ebs_volume.data"),
+             "name": "  State contains aws_ebs_volume.data"},
+        ],
+    },
+]
+
+
+class FileSnapshot:
+    """Reads each file at most once per grading run.
+
+    The registry evaluator prefetches every referenced file concurrently
+    and answers all predicates from this snapshot.
+    """
+
+    def __init__(self):
+        self._exists = {}
+        self._content = {}
+
+    def prefetch(self, paths, max_workers=8):
+        paths = sorted(set(paths) - set(self._exists))
+        if not paths:
+            return
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            for path, content in zip(paths, pool.map(_read_for_matching, paths)):
+                self._exists[path] = content is not None or \
+                    check_file_exists(path)
+                self._content[path] = content
+
+    def exists(self, path):
+        if path not in self._exists:
+            self.prefetch([path])
+        return self._exists[path]
+
+    def contains(self, path, pattern):
+        if path not in self._content:
+            self.prefetch([path])
+        content = self._content[path]
+        return content is not None and pattern in content
+
+
+def _evaluate_predicate(test, base, snapshot):
+    """Evaluate one registry predicate tuple against a FileSnapshot."""
+    kind, args = test[0], test[1:]
+    paths = [f'{base}/{p}' for p in args]
+    if kind == "exists":
+        return snapshot.exists(paths[0])
+    if kind == "any_exists":
+        return any(snapshot.exists(p) for p in paths)
+    if kind == "all_exists":
+        return all(snapshot.exists(p) for p in paths)
+    if kind == "contains":
+        return snapshot.contains(paths[0], args[1])
+    raise ValueError(f"Unknown check predicate: {kind}")
+
+
+def compile_file_checks(registry):
+    """Validate the registry and resolve each check's dependencies.
+
+    Returns (scenarios, paths): scenarios is the registry with every check's
+    "requires" expanded to include preceding gates, and paths is the set of
+    files any predicate touches, so they can be read once up front.
+    """
+    compiled = []
+    paths = set()
+    for scenario in registry:
+        seen = set()
+        gates = []
+        checks = []
+        for check in scenario["checks"]:
+            requires = list(check.get("requires", []))
+            for dep in requires:
+                if dep not in seen:
+                    raise ValueError(
+                        f"Scenario {scenario['scenario']}: check "
+                        f"'{check['id']}' requires unknown or later check '{dep}'")
+            checks.append(dict(check, requires=gates + requires))
+            seen.add(check["id"])
+            if check.get("gate"):
+                gates.append(check["id"])
+            test = check["test"]
+            targets = test[1:2] if test[0] == "contains" else test[1:]
+            paths.update(f"{scenario['base']}/{p}" for p in targets)
+        compiled.append(dict(scenario, checks=checks))
+    return compiled, paths
+
+
+def evaluate_file_checks(scenario, snapshot):
+    """Evaluate a compiled scenario. Returns [(check, outcome)].
+
+    outcome is True/False, or None if the check was skipped because a
+    check it requires did not pass. Checks are listed in dependency order,
+    so a failed gate short-circuits every predicate after it. Files are
+    read up front by FileSnapshot.prefetch(), so skipping a check saves
+    evaluation, not I/O.
+    """
+    outcomes = {}
+    results = []
+    for check in scenario["checks"]:
+        if not all(outcomes.get(dep) for dep in check["requires"]):
+            outcome = None
+        else:
+            outcome = _evaluate_predicate(check["test"], scenario["base"],
+                                          snapshot)
+        outcomes[check["id"]] = outcome
+        results.append((check, outcome))
+    return results
 
-def grade_scenario_2_files():
-    """Grade Scenario 2: Import - File checks only."""
-    print_section("Scenario 2: Import Existing Resources (Files)")
 
+def report_file_checks(scenario, results):
+    """Print evaluated checks and return the counted outcomes."""
+    print_section(scenario["title"])
     checks = []
-    base = "scenario-2-import"
-
-    # Check main.tf exists
-    if check_file_exists(f'{base}/main.tf'):
-        checks.append(check_passed("main.tf exists"))
-    else:
-        checks.append(check_failed("main.tf exists"))
-        return checks
-
-    # Check aws_instance resource defined
-    if check_file_contains(f'{base}/main.tf', 'resource "aws_instance"'):
-        checks.append(check_passed("aws_instance resource defined"))
-    else:
-        checks.append(check_failed("aws_instance resource defined",
-            "Add: resource \"aws_instance\" \"imported\" { ... }"))
-
-    # Check resource named correctly
-    if check_file_contains(f'{base}/main.tf', 'imported'):
-        checks.append(check_passed("Resource named 'imported'"))
-    else:
-        checks.append(check_failed("Resource named 'imported'",
-            "Name your resource: aws_instance.imported"))
-
-    # Check setup.sh exists
-    if check_file_exists(f'{base}/setup.sh'):
-        checks.append(check_passed("setup.sh exists"))
-    else:
-        checks.append(check_failed("setup.sh exists"))
-
+    for check, outcome in results:
+        if outcome is None:
+            continue
+        if check.get("info"):
+            if outcome:
+                check_info(check["name"])
+        elif outcome:
+            checks.append(check_passed(check["name"]))
+        elif "fail_info" in check:
+            check_info(check["fail_info"])
+        else:
+            checks.append(check_failed(check.get("fail", check["name"]),
+                                       check.get("hint", "")))
     return checks
 
 
-def grade_scenario_3_files():
-    """Grade Scenario 3: Move Resources - File checks only."""
-    print_section("Scenario 3: Move Resources Between States (Files)")
+def grade_file_checks(registry=FILE_CHECKS):
+    """Grade every scenario in the registry - file checks only."""
+    scenarios, paths = compile_file_checks(registry)
+    snapshot = FileSnapshot()
+    snapshot.prefetch(paths)
 
     checks = []
+    for scenario in scenarios:
+        results = evaluate_file_checks(scenario, snapshot)
+        checks.extend(report_file_checks(scenario, results))
+    return checks
 
-    # Check old-project exists
-    if check_file_exists('scenario-3-move/old-project/main.tf'):
-        checks.append(check_passed("old-project/main.tf exists"))
-    else:
-        checks.append(check_failed("old-project/main.tf exists"))
 
-    # Check new-project exists
-    if check_file_exists('scenario-3-move/new-project/main.tf'):
-        checks.append(check_passed("new-project/main.tf exists"))
-    else:
-        checks.append(check_failed("new-project/main.tf exists"))
+# =============================================================================
+# LOCALSTACK SANDBOXES
+# =============================================================================
 
-    # Check old-project has resources
-    if check_file_contains('scenario-3-move/old-project/main.tf', 'aws_instance'):
-        checks.append(check_passed("old-project has aws_instance"))
-    else:
-        checks.append(check_failed("old-project has aws_instance"))
+LOCALSTACK_ENDPOINT = "http://localhost:4566"
 
-    # Check move script exists
-    if check_file_exists('scenario-3-move/move-resources.sh'):
-        checks.append(check_passed("move-resources.sh exists"))
-    else:
-        checks.append(check_failed("move-resources.sh exists",
-            "Create script with terraform state mv commands"))
+# Files and directories never copied into a sandbox workspace
+SANDBOX_IGNORE = shutil.ignore_patterns(".terraform", "*.tfstate.lock.info")
 
-    return checks
 
+def check_endpoint_healthy(endpoint, timeout=5):
+    """Check if a LocalStack endpoint answers its health check."""
+    try:
+        with urllib.request.urlopen(f"{endpoint}/_localstack/health",
+                                    timeout=timeout) as response:
+            return response.status == 200
+    except Exception:
+        return False
 
-def grade_scenario_4_files():
-    """Grade Scenario 4: Backend Migration - File checks only."""
-    print_section("Scenario 4: Backend Migration (Files)")
 
-    checks = []
-    base = "scenario-4-backend-migration"
+def localstack_env():
+    """Environment for aws/terraform commands talking to LocalStack."""
+    env = dict(os.environ)
+    env.setdefault("AWS_ACCESS_KEY_ID", "test")
+    env.setdefault("AWS_SECRET_ACCESS_KEY", "test")
+    env.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+    return env
 
-    # Check main.tf exists
-    if check_file_exists(f'{base}/main.tf'):
-        checks.append(check_passed("main.tf exists"))
-    else:
-        checks.append(check_failed("main.tf exists"))
-        return checks
 
-    # Check backend-a.tf exists (or .bak if migration done)
-    has_backend_a = check_file_exists(f'{base}/backend-a.tf') or \
-                    check_file_exists(f'{base}/backend-a.tf.bak')
-    if has_backend_a:
-        checks.append(check_passed("backend-a.tf exists"))
-    else:
-        checks.append(check_failed("backend-a.tf exists",
-            "Create backend-a.tf with source S3 bucket"))
-
-    # Check backend-b.tf exists (or .example if not yet migrated)
-    has_backend_b = check_file_exists(f'{base}/backend-b.tf') or \
-                    check_file_exists(f'{base}/backend-b.tf.example')
-    if has_backend_b:
-        checks.append(check_passed("backend-b.tf exists"))
-    else:
-        checks.append(check_failed("backend-b.tf exists",
-            "Create backend-b.tf with target S3 bucket"))
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except (PermissionError, OSError):
+        return True
+    return True
 
-    # Check create-buckets script exists
-    if check_file_exists(f'{base}/create-buckets.sh') or \
-       check_file_exists(f'{base}/create-buckets.ps1'):
-        checks.append(check_passed("create-buckets script exists"))
-    else:
-        checks.append(check_failed("create-buckets script exists"))
 
-    # Check if migration was completed (backend-b.tf is active, backend-a.tf.bak exists)
-    if check_file_exists(f'{base}/backend-b.tf') and \
-       check_file_exists(f'{base}/backend-a.tf.bak'):
-        checks.append(check_passed("Migration completed (backend files swapped)"))
+def acquire_endpoint(pool):
+    """Lease a LocalStack endpoint from the pool. Returns (endpoint, lockfile).
+
+    Each endpoint gets a lock file in the temp directory holding the owner's
+    PID, so concurrent grading processes on one host spread across the pool.
+    Leases held by dead processes are reclaimed. When every endpoint is busy
+    the least recently leased one is shared - runs stay isolated through
+    their bucket prefixes either way, the pool only spreads the load.
+    """
+    lock_dir = Path(tempfile.gettempdir())
+    candidates = []
+    for endpoint in pool:
+        name = re.sub(r'[^A-Za-z0-9]+', '_', endpoint)
+        lockfile = lock_dir / f"tfsm-endpoint-{name}.lock"
+        for _ in range(2):
+            try:
+                fd = os.open(lockfile, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            except FileExistsError:
+                try:
+                    pid = int(lockfile.read_text().strip() or 0)
+                    mtime = lockfile.stat().st_mtime
+                except (OSError, ValueError):
+                    break
+                if pid and _pid_alive(pid):
+                    candidates.append((mtime, endpoint))
+                    break
+                # Stale lease from a crashed run
+                try:
+                    lockfile.unlink()
+                except OSError:
+                    break
+                continue
+            with os.fdopen(fd, "w") as f:
+                f.write(str(os.getpid()))
+            return endpoint, lockfile
+    candidates.sort()
+    return (candidates[0][1] if candidates else pool[0]), None
+
+
+def find_s3_backend_block(text):
+    """Return (first, last) line index of the active backend "s3" block.
+
+    Commented-out lines are ignored, so a template's example block doesn't
+    count. Returns None if there is no active S3 backend.
+    """
+    start = None
+    depth = 0
+    opened = False
+    for index, line in enumerate(text.split("\n")):
+        code = line.split("#", 1)[0]
+        if start is None:
+            if not re.search(r'\bbackend\s+"s3"', code):
+                continue
+            start = index
+        depth += code.count("{") - code.count("}")
+        opened = opened or "{" in code
+        if opened and depth <= 0:
+            return start, index
+    return None
+
+
+def redirect_s3_backend(text, bucket, endpoint):
+    """Point the active S3 backend block in `text` at another bucket/endpoint.
+
+    Only the bucket and the S3 endpoint change; key, region, credentials
+    and the LocalStack skip_* flags are kept as the student wrote them.
+    """
+    span = find_s3_backend_block(text)
+    if span is None:
+        return text
+    lines = text.split("\n")
+    first, last = span
+    block = "\n".join(lines[first:last + 1])
+    block = re.sub(r'^(\s*bucket\s*=\s*)"[^"]*"', rf'\g<1>"{bucket}"',
+                   block, count=1, flags=re.M)
+
+    endpoints = re.search(r'^[ \t]*endpoints\s*=\s*\{([^}]*)\}', block, re.M)
+    if endpoints:
+        # One-line `endpoints = { s3 = "..." }` or a multi-line object
+        body = endpoints.group(1)
+        body, found = re.subn(r'^(?![ \t]*#)([^\n]*?\bs3\s*=\s*)"[^"]*"',
+                              rf'\g<1>"{endpoint}"', body, count=1, flags=re.M)
+        if not found:
+            if "\n" in body:
+                body = f'\n      s3 = "{endpoint}"' + body
+            else:
+                body = f' s3 = "{endpoint}",' + body
+        block = block[:endpoints.start(1)] + body + block[endpoints.end(1):]
     else:
-        check_info("Migration not yet completed (backend-b.tf not active)")
-
-    return checks
+        # Legacy `endpoint = "..."`, or no endpoint at all
+        block, found = re.subn(r'^(\s*endpoint\s*=\s*)"[^"]*"',
+                               rf'\g<1>"{endpoint}"', block, count=1, flags=re.M)
+        if not found:
+            block_lines = block.split("\n")
+            block_lines.insert(len(block_lines) - 1,
+                               f'    endpoints = {{ s3 = "{endpoint}" }}')
+            block = "\n".join(block_lines)
+    return "\n".join(lines[:first] + [block] + lines[last + 1:])
+
+
+class LocalStackSandbox:
+    """Isolates one live verification run from every other on the host.
+
+    When isolated, each scenario is verified in a temporary copy of its
+    directory whose S3 backend is rewritten to a per-run bucket on the
+    leased endpoint, seeded from the student's state bucket. Buckets are
+    created like create-bucket(s).sh does, minus versioning so that
+    `aws s3 rb --force` can remove them on teardown. Without isolation
+    every method is a no-op and the verifiers use the repo and shared
+    LocalStack directly.
+    """
+
+    def __init__(self, pool=None, isolated=False, run_id=None):
+        self.pool = pool or [LOCALSTACK_ENDPOINT]
+        self.isolated = isolated
+        self.run_id = run_id or f"tfsm-{uuid.uuid4().hex[:8]}"
+        self.endpoint = LOCALSTACK_ENDPOINT
+        self.source_endpoint = LOCALSTACK_ENDPOINT
+        self._lockfile = None
+        self._workspace = None
+        self._buckets = []
+        self._workdirs = {}
+
+    def __enter__(self):
+        self.setup()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.teardown()
+        return False
 
+    def setup(self):
+        if not self.isolated:
+            return
+        self.endpoint, self._lockfile = acquire_endpoint(self.pool)
+        self._workspace = tempfile.mkdtemp(prefix=f"{self.run_id}-")
+
+    def bucket(self, name):
+        """Name of the bucket standing in for `name` in this run."""
+        if not self.isolated:
+            return name
+        # S3 bucket names are capped at 63 characters
+        return f"{self.run_id}-{name}"[:63].rstrip("-")
+
+    def _aws(self, args, endpoint=None, timeout=60):
+        return run_command(["aws"] + args +
+                           ["--endpoint-url", endpoint or self.endpoint],
+                           timeout=timeout, env=localstack_env())
+
+    def _create_bucket(self, name):
+        """Create an unversioned sandbox bucket."""
+        success, output = self._aws(["s3", "mb", f"s3://{name}"])
+        if success or "BucketAlreadyOwnedByYou" in output:
+            self._buckets.append(name)
+            return True
+        return False
 
-def grade_scenario_5_files():
-    """Grade Scenario 5: State Recovery - File checks only."""
-    print_section("Scenario 5: State Recovery (Files)")
+    def _seed_bucket(self, source, target):
+        """Copy the student's state objects into the sandbox bucket.
 
-    checks = []
-    base = "scenario-5-state-recovery"
+        A missing source bucket leaves the sandbox empty, just as the
+        student's own init would find no state. Any other failure raises,
+        since an empty sandbox would fail checks for the wrong reason.
+        """
+        success, _ = self._aws(["s3api", "head-bucket", "--bucket", source],
+                               endpoint=self.source_endpoint)
+        if not success:
+            return
+        staging = tempfile.mkdtemp(dir=self._workspace)
+        success, output = self._aws(["s3", "sync", f"s3://{source}", staging],
+                                    endpoint=self.source_endpoint, timeout=120)
+        if success:
+            success, output = self._aws(["s3", "sync", staging, f"s3://{target}"],
+                                        timeout=120)
+        if not success:
+            raise RuntimeError(f"Could not copy state from s3://{source} into "
+                               f"sandbox bucket {target}: {output.strip()}")
+
+    def prepare(self, base):
+        """Return the directory to verify `base` in, setting it up if needed."""
+        if not self.isolated:
+            return base
+        if base in self._workdirs:
+            return self._workdirs[base]
+
+        workdir = os.path.join(self._workspace, base)
+        shutil.copytree(base, workdir, ignore=SANDBOX_IGNORE)
+        self._workdirs[base] = workdir
+
+        for tf_file in sorted(Path(workdir).glob("*.tf")):
+            text = tf_file.read_text(encoding="utf-8")
+            span = find_s3_backend_block(text)
+            if span is None:
+                continue
+            lines = text.split("\n")
+            match = re.search(r'^\s*bucket\s*=\s*"([^"]+)"',
+                              "\n".join(lines[span[0]:span[1] + 1]), re.M)
+            if not match:
+                # Leaving it would verify against the shared bucket
+                raise RuntimeError(f"Cannot isolate {base}: the backend bucket "
+                                   f"in {tf_file.name} is not a string literal")
+            source = match.group(1)
+            target = self.bucket(source)
+            if not self._create_bucket(target):
+                raise RuntimeError(f"Could not create sandbox bucket {target} "
+                                   f"on {self.endpoint}")
+            self._seed_bucket(source, target)
+            # Edit the copy in place: a backend block in an *_override.tf
+            # would replace the student's block instead of merging into it
+            tf_file.write_text(redirect_s3_backend(text, target, self.endpoint),
+                               encoding="utf-8")
+            break
+        return workdir
+
+    def teardown(self):
+        if not self.isolated:
+            return
+        for name in self._buckets:
+            self._aws(["s3", "rb", f"s3://{name}", "--force"])
+        self._buckets = []
+        if self._workspace:
+            shutil.rmtree(self._workspace, ignore_errors=True)
+            self._workspace = None
+        if self._lockfile:
+            try:
+                self._lockfile.unlink()
+            except OSError:
+                pass
+            self._lockfile = None
 
-    # Check main.tf exists
-    if check_file_exists(f'{base}/main.tf'):
-        checks.append(check_passed("main.tf exists"))
-    else:
-        checks.append(check_failed("main.tf exists"))
-        return checks
 
-    # Check main.tf has required resources
-    if check_file_contains(f'{base}/main.tf', 'aws_instance'):
-        checks.append(check_passed("aws_instance resource defined"))
-    else:
-        checks.append(check_failed("aws_instance resource defined"))
-
-    if check_file_contains(f'{base}/main.tf', 'aws_security_group'):
-        checks.append(check_passed("aws_security_group resource defined"))
-    else:
-        checks.append(check_failed("aws_security_group resource defined"))
+# =============================================================================
+# RESOURCE DISCOVERY
+# =============================================================================
 
-    if check_file_contains(f'{base}/main.tf', 'aws_ebs_volume'):
-        checks.append(check_passed("aws_ebs_volume resource defined"))
-    else:
-        checks.append(check_failed("aws_ebs_volume resource defined"))
+# Per user rather than per checkout: the resources belong to the account,
+# and --serve grades checkouts that are read-only or deleted afterwards
+DISCOVERY_CACHE = os.environ.get(
+    "TFSM_DISCOVERY_CACHE",
+    os.path.join(Path.home(), ".terraform-state-migration", "discovery-cache.json"))
+DISCOVERY_TTL = int(os.environ.get("TFSM_DISCOVERY_TTL", "300"))
+
+# Files the setup scripts write after creating resources, relative to the
+# repo being graded. If one is newer than the cache, the resources were
+# recreated and the cache is stale.
+DISCOVERY_MARKERS = [
+    "scenario-2-import/.instance_id",
+    "scenario-5-state-recovery/resource-ids.txt",
+]
+
+# Resources the setup scripts create, per scenario:
+# (terraform address, resource kind, Name tag / group name)
+IMPORT_TARGETS = {
+    "2": [
+        ("aws_instance.imported", "instance", "manually-created-instance"),
+    ],
+    "5": [
+        ("aws_instance.web", "instance", "recovery-web-server"),
+        ("aws_security_group.web", "security_group", "recovery-web-sg"),
+        ("aws_ebs_volume.data", "volume", "recovery-data-volume"),
+    ],
+}
+
+
+def _name_tag(item):
+    for tag in item.get("Tags") or []:
+        if tag.get("Key") == "Name":
+            return tag.get("Value")
+    return None
+
+
+def _describe(args, mode):
+    """Run one `aws ec2 describe-*` call (the CLI paginates it fully)."""
+    argv = ["aws", "ec2"] + args + ["--output", "json"]
+    env = None
+    if mode == "localstack":
+        argv += ["--endpoint-url", LOCALSTACK_ENDPOINT]
+        env = localstack_env()
+    # CLI warnings go to stderr and would corrupt the JSON
+    success, output = run_command(argv, timeout=120, env=env,
+                                  merge_stderr=False)
+    if not success:
+        raise RuntimeError(output.strip() or f"aws ec2 {args[0]} failed")
+    return json.loads(output)
+
+
+def discover_resources(mode="localstack"):
+    """Enumerate instances, volumes and security groups in one bulk pass.
+
+    Returns {kind: {name: id}}. Instances and volumes are keyed by their
+    Name tag, security groups by Name tag or group name. When several
+    live resources share a name (a setup script was re-run) the newest
+    one wins.
+    """
+    calls = {
+        "instance": ["describe-instances"],
+        "volume": ["describe-volumes"],
+        "security_group": ["describe-security-groups"],
+    }
+    with ThreadPoolExecutor(max_workers=len(calls)) as pool:
+        futures = {kind: pool.submit(_describe, args, mode)
+                   for kind, args in calls.items()}
+        raw = {kind: future.result() for kind, future in futures.items()}
+
+    resources = {kind: {} for kind in calls}
+
+    instances = [i for r in raw["instance"].get("Reservations", [])
+                 for i in r.get("Instances", [])]
+    instances.sort(key=lambda i: i.get("LaunchTime", ""))
+    for instance in instances:
+        state = instance.get("State", {}).get("Name")
+        name = _name_tag(instance)
+        if name and state not in ("terminated", "shutting-down"):
+            resources["instance"][name] = instance["InstanceId"]
+
+    volumes = raw["volume"].get("Volumes", [])
+    volumes.sort(key=lambda v: v.get("CreateTime", ""))
+    for volume in volumes:
+        name = _name_tag(volume)
+        if name and volume.get("State") != "deleting":
+            resources["volume"][name] = volume["VolumeId"]
+
+    for group in raw["security_group"].get("SecurityGroups", []):
+        name = _name_tag(group) or group.get("GroupName")
+        if name:
+            resources["security_group"][name] = group["GroupId"]
+
+    return resources
+
+
+class DiscoveryCache:
+    """TTL cache of discovered resource IDs, shared across runs.
+
+    Stored in DISCOVERY_CACHE, keyed by mode and endpoint/region, so the
+    import helper and the live verifiers describe each account at most
+    once per TTL.
+    """
+
+    def __init__(self, path=DISCOVERY_CACHE, ttl=DISCOVERY_TTL):
+        self.path = path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(mode):
+        if mode == "localstack":
+            return f"localstack:{LOCALSTACK_ENDPOINT}"
+        return f"aws:{os.environ.get('AWS_DEFAULT_REGION', 'us-east-1')}"
+
+    def _load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _is_fresh(self, entry):
+        fetched_at = entry.get("fetched_at", 0)
+        if time.time() - fetched_at > self.ttl:
+            return False
+        for marker in DISCOVERY_MARKERS:
+            if os.path.exists(marker) and os.path.getmtime(marker) > fetched_at:
+                return False
+        return True
+
+    def get(self, mode="localstack", refresh=False):
+        """Return {kind: {name: id}}, describing the account only if needed."""
+        key = self._key(mode)
+        with self._lock:
+            cache = self._load()
+            entry = cache.get(key)
+            if entry and not refresh and self._is_fresh(entry):
+                return entry["resources"]
+            resources = discover_resources(mode)
+            cache[key] = {"fetched_at": time.time(), "resources": resources}
+            try:
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)),
+                            exist_ok=True)
+                with open(self.path, 'w', encoding='utf-8') as f:
+                    json.dump(cache, f, indent=2)
+            except OSError:
+                pass
+            return resources
+
+    def import_ids(self, scenario, mode="localstack"):
+        """Map each IMPORT_TARGETS address of a scenario to its ID (or None)."""
+        resources = self.get(mode)
+        return {address: resources.get(kind, {}).get(name)
+                for address, kind, name in IMPORT_TARGETS[scenario]}
+
+
+DISCOVERY = DiscoveryCache()
+
+
+def import_hint(scenario, mode, addresses=None):
+    """Build a "Run: terraform import ..." hint with the real IDs filled in."""
+    try:
+        ids = DISCOVERY.import_ids(scenario, mode)
+    except Exception:
+        ids = {}
+    commands = [f"terraform import {address} {ids.get(address) or '<id>'}"
+                for address, _, _ in IMPORT_TARGETS[scenario]
+                if addresses is None or address in addresses]
+    return "Run: " + "; ".join(commands)
 
-    # Check simulate-disaster script exists
-    if check_file_exists(f'{base}/simulate-disaster.sh') or \
-       check_file_exists(f'{base}/simulate-disaster.ps1'):
-        checks.append(check_passed("simulate-disaster script exists"))
-    else:
-        checks.append(check_failed("simulate-disaster script exists"))
-
-    # Check if state recovery was completed (terraform.tfstate exists)
-    if check_file_exists(f'{base}/terraform.tfstate'):
-        checks.append(check_passed("State file recovered (terraform.tfstate exists)"))
-        # Bonus: check state has the resources
-        if check_file_contains(f'{base}/terraform.tfstate', 'aws_instance.web'):
-            check_info("  State contains aws_instance.web")
-        if check_file_contains(f'{base}/terraform.tfstate', 'aws_security_group.web'):
-            check_info("  State contains aws_security_group.web")
-        if check_file_contains(f'{base}/terraform.tfstate', 'aws_ebs_volume.data'):
-            check_info("  State contains aws_ebs_volume.data")
-    else:
-        check_info("State not yet recovered (run terraform import commands)")
 
-    return checks
+def show_import_commands(mode="localstack"):
+    """Print the terraform import commands for scenarios 2 and 5."""
+    try:
+        DISCOVERY.get(mode)
+    except Exception as e:
+        check_failed("Resource discovery", str(e))
+        return 1
+    for scenario, base in (("2", "scenario-2-import"),
+                           ("5", "scenario-5-state-recovery")):
+        print_section(f"Scenario {scenario}: Import Commands ({base})")
+        for address, resource_id in DISCOVERY.import_ids(scenario, mode).items():
+            if resource_id:
+                print(f"  terraform import {address} {resource_id}")
+            else:
+                check_info(f"{address}: not found (run the setup script first)")
+    return 0
 
 
 # =============================================================================
 # LIVE TERRAFORM VERIFICATION
 # =============================================================================
 
-def verify_scenario_1_live(mode="localstack"):
+def verify_scenario_1_live(mode="localstack", sandbox=None):
     """Verify Scenario 1 with live Terraform commands."""
+    sandbox = sandbox or LocalStackSandbox()
     print_section(f"Scenario 1: Live Verification ({mode.upper()})")
 
     checks = []
     base = "scenario-1-local-to-remote"
+    workdir = sandbox.prepare(base)
 
     # Check terraform init works
     check_info("Running terraform init...")
-    success, output = run_command("terraform init -input=false", cwd=base, timeout=120)
+    success, output = run_command(["terraform", "init", "-input=false"], cwd=workdir, timeout=120)
     if success:
         checks.append(check_passed("terraform init succeeded"))
     else:
@@ -395,7 +1135,7 @@ def verify_scenario_1_live(mode="localstack"):
 
     # Check terraform plan shows no changes (state migrated correctly)
     check_info("Running terraform plan...")
-    success, output = run_command("terraform plan -detailed-exitcode", cwd=base, timeout=120)
+    success, output = run_command(["terraform", "plan", "-detailed-exitcode"], cwd=workdir, timeout=120)
 
     # Exit code 0 = no changes, 1 = error, 2 = changes pending
     if "No changes" in output or success:
@@ -406,7 +1146,7 @@ def verify_scenario_1_live(mode="localstack"):
 
     # Check state list shows resources
     check_info("Checking state list...")
-    success, output = run_command("terraform state list", cwd=base, timeout=30)
+    success, output = run_command(["terraform", "state", "list"], cwd=workdir, timeout=30)
     if success and "aws_" in output:
         checks.append(check_passed(f"State contains resources"))
         for line in output.strip().split('\n'):
@@ -419,8 +1159,10 @@ def verify_scenario_1_live(mode="localstack"):
     if mode == "localstack":
         check_info("Checking S3 bucket for state file...")
         success, output = run_command(
-            "aws s3 ls s3://terraform-state-migration-demo/ --endpoint-url http://localhost:4566 --recursive",
-            timeout=30
+            ["aws", "s3", "ls",
+             f"s3://{sandbox.bucket('terraform-state-migration-demo')}/",
+             "--endpoint-url", sandbox.endpoint, "--recursive"],
+            timeout=30, env=localstack_env()
         )
         if success and "terraform.tfstate" in output:
             checks.append(check_passed("State file exists in S3 bucket"))
@@ -431,16 +1173,18 @@ def verify_scenario_1_live(mode="localstack"):
     return checks
 
 
-def verify_scenario_2_live(mode="localstack"):
+def verify_scenario_2_live(mode="localstack", sandbox=None):
     """Verify Scenario 2 with live Terraform commands."""
+    sandbox = sandbox or LocalStackSandbox()
     print_section(f"Scenario 2: Live Verification ({mode.upper()})")
 
     checks = []
     base = "scenario-2-import"
+    workdir = sandbox.prepare(base)
 
     # Check terraform init works
     check_info("Running terraform init...")
-    success, output = run_command("terraform init -input=false", cwd=base, timeout=120)
+    success, output = run_command(["terraform", "init", "-input=false"], cwd=workdir, timeout=120)
     if success:
         checks.append(check_passed("terraform init succeeded"))
     else:
@@ -449,17 +1193,17 @@ def verify_scenario_2_live(mode="localstack"):
 
     # Check state has imported resource
     check_info("Checking for imported resource...")
-    success, output = run_command("terraform state list", cwd=base, timeout=30)
+    success, output = run_command(["terraform", "state", "list"], cwd=workdir, timeout=30)
     if success and "imported" in output:
         checks.append(check_passed("Imported resource exists in state"))
     else:
         checks.append(check_failed("Imported resource exists in state",
-            "Run: terraform import aws_instance.imported <instance-id>"))
+            import_hint("2", mode)))
         return checks
 
     # Check terraform plan shows no changes
     check_info("Running terraform plan...")
-    success, output = run_command("terraform plan -detailed-exitcode", cwd=base, timeout=120)
+    success, output = run_command(["terraform", "plan", "-detailed-exitcode"], cwd=workdir, timeout=120)
     if "No changes" in output or success:
         checks.append(check_passed("terraform plan shows no changes (import complete!)"))
     else:
@@ -469,8 +1213,9 @@ def verify_scenario_2_live(mode="localstack"):
     return checks
 
 
-def verify_scenario_4_live(mode="localstack"):
+def verify_scenario_4_live(mode="localstack", sandbox=None):
     """Verify Scenario 4 with live Terraform commands."""
+    sandbox = sandbox or LocalStackSandbox()
     print_section(f"Scenario 4: Live Verification ({mode.upper()})")
 
     checks = []
@@ -482,9 +1227,11 @@ def verify_scenario_4_live(mode="localstack"):
         check_info("Rename backend-b.tf.example to backend-b.tf")
         return checks
 
+    workdir = sandbox.prepare(base)
+
     # Check terraform init works
     check_info("Running terraform init...")
-    success, output = run_command("terraform init -input=false", cwd=base, timeout=120)
+    success, output = run_command(["terraform", "init", "-input=false"], cwd=workdir, timeout=120)
     if success:
         checks.append(check_passed("terraform init succeeded"))
     else:
@@ -493,7 +1240,7 @@ def verify_scenario_4_live(mode="localstack"):
 
     # Check terraform plan shows no changes
     check_info("Running terraform plan...")
-    success, output = run_command("terraform plan -detailed-exitcode", cwd=base, timeout=120)
+    success, output = run_command(["terraform", "plan", "-detailed-exitcode"], cwd=workdir, timeout=120)
     if "No changes" in output or success:
         checks.append(check_passed("terraform plan shows no changes (migration complete!)"))
     else:
@@ -503,8 +1250,9 @@ def verify_scenario_4_live(mode="localstack"):
     if mode == "localstack":
         check_info("Checking state in target bucket...")
         success, output = run_command(
-            "aws s3 ls s3://tfstate-bucket-b/ --endpoint-url http://localhost:4566 --recursive",
-            timeout=30
+            ["aws", "s3", "ls", f"s3://{sandbox.bucket('tfstate-bucket-b')}/",
+             "--endpoint-url", sandbox.endpoint, "--recursive"],
+            timeout=30, env=localstack_env()
         )
         if success and "terraform.tfstate" in output:
             checks.append(check_passed("State file exists in target bucket (bucket-b)"))
@@ -515,16 +1263,18 @@ def verify_scenario_4_live(mode="localstack"):
     return checks
 
 
-def verify_scenario_5_live(mode="localstack"):
+def verify_scenario_5_live(mode="localstack", sandbox=None):
     """Verify Scenario 5 with live Terraform commands."""
+    sandbox = sandbox or LocalStackSandbox()
     print_section(f"Scenario 5: Live Verification ({mode.upper()})")
 
     checks = []
     base = "scenario-5-state-recovery"
+    workdir = sandbox.prepare(base)
 
     # Check terraform init works
     check_info("Running terraform init...")
-    success, output = run_command("terraform init -input=false", cwd=base, timeout=120)
+    success, output = run_command(["terraform", "init", "-input=false"], cwd=workdir, timeout=120)
     if success:
         checks.append(check_passed("terraform init succeeded"))
     else:
@@ -533,7 +1283,7 @@ def verify_scenario_5_live(mode="localstack"):
 
     # Check state has resources (recovery done)
     check_info("Checking recovered state...")
-    success, output = run_command("terraform state list", cwd=base, timeout=30)
+    success, output = run_command(["terraform", "state", "list"], cwd=workdir, timeout=30)
     if success and output.strip():
         resources = [r.strip() for r in output.strip().split('\n') if r.strip()]
         if len(resources) >= 3:
@@ -541,16 +1291,18 @@ def verify_scenario_5_live(mode="localstack"):
             for res in resources:
                 check_info(f"  Found: {res}")
         else:
+            missing = [address for address, _, _ in IMPORT_TARGETS["5"]
+                       if address not in resources]
             checks.append(check_failed("All 3 resources recovered",
-                "Import all: aws_instance.web, aws_security_group.web, aws_ebs_volume.data"))
+                import_hint("5", mode, missing)))
     else:
         checks.append(check_failed("State has resources",
-            "Run: terraform import aws_instance.web <id>"))
+            import_hint("5", mode)))
         return checks
 
     # Check terraform plan shows no changes
     check_info("Running terraform plan...")
-    success, output = run_command("terraform plan -detailed-exitcode", cwd=base, timeout=120)
+    success, output = run_command(["terraform", "plan", "-detailed-exitcode"], cwd=workdir, timeout=120)
     if "No changes" in output or success:
         checks.append(check_passed("terraform plan shows no changes (recovery complete!)"))
     else:
@@ -560,6 +1312,31 @@ def verify_scenario_5_live(mode="localstack"):
     return checks
 
 
+def run_live_verifiers(verifiers, mode, sandbox=None):
+    """Run live verifiers, cancelling all in-flight commands on a fatal error.
+
+    A verifier that raises (or Ctrl+C) counts as fatal: every running
+    terraform/aws process is killed and the remaining verifiers are skipped.
+    """
+    sandbox = sandbox or LocalStackSandbox()
+    checks = []
+    try:
+        with sandbox:
+            for verify in verifiers:
+                if CANCEL_EVENT.is_set():
+                    break
+                checks.extend(verify(mode, sandbox))
+    except KeyboardInterrupt:
+        cancel_all_commands()
+        print_section("Live Verification")
+        checks.append(check_failed("Live verification interrupted"))
+    except Exception as e:
+        cancel_all_commands()
+        print_section("Live Verification")
+        checks.append(check_failed(f"Live verification aborted: {e}"))
+    return checks
+
+
 # =============================================================================
 # EVIDENCE FILE CHECKS
 # =============================================================================
@@ -630,11 +1407,561 @@ def grade_evidence_files():
     return checks
 
 
+# =============================================================================
+# RESULTS HISTORY
+# =============================================================================
+
+RESULTS_DB = os.environ.get(
+    "TFSM_RESULTS_DB",
+    os.path.join(Path.home(), ".terraform-state-migration", "results.db"))
+
+# --history reads the recent runs plus this many times as many before them
+HISTORY_BASELINE_RUNS = 4
+
+RESULTS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id          INTEGER PRIMARY KEY AUTOINCREMENT,
+    started_at  REAL NOT NULL,
+    repo        TEXT NOT NULL,
+    commit_sha  TEXT NOT NULL,
+    mode        TEXT NOT NULL,
+    verify      INTEGER NOT NULL,
+    evidence    INTEGER NOT NULL,
+    passed      INTEGER NOT NULL,
+    total       INTEGER NOT NULL,
+    score       REAL NOT NULL,
+    duration    REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS results (
+    run_id      INTEGER NOT NULL REFERENCES runs(id),
+    repo        TEXT NOT NULL,
+    scenario    TEXT NOT NULL,
+    commit_sha  TEXT NOT NULL,
+    section     TEXT NOT NULL,
+    check_name  TEXT NOT NULL,
+    passed      INTEGER NOT NULL,
+    duration    REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_runs_repo ON runs (repo, started_at);
+CREATE INDEX IF NOT EXISTS idx_results_key ON results (repo, scenario, commit_sha);
+CREATE INDEX IF NOT EXISTS idx_results_run ON results (repo, run_id);
+"""
+
+
+class ResultRecorder:
+    """Collects every check outcome of a run with the time it took.
+
+    check_passed()/check_failed() report here when a recorder is active. A
+    check's duration is the time since the previous check or section
+    started, which covers the terraform/aws commands run for it.
+
+    `repo` and `commit` identify what is being graded. They are resolved
+    up front because git can't be run once a fatal error has cancelled
+    all commands.
+    """
+
+    def __init__(self, repo=None, commit=None):
+        self.started_at = time.time()
+        self.repo = repo
+        self.commit = commit
+        self.section = ""
+        self.records = []
+        # Cleared around the environment probes, which don't count toward
+        # the score and so aren't results
+        self.scored = True
+        self._mark = time.monotonic()
+
+    def start_section(self, title):
+        self.section = title
+        self._mark = time.monotonic()
+
+    def record(self, message, passed, hint=""):
+        if not self.scored:
+            return
+        now = time.monotonic()
+        match = re.match(r'Scenario (\d+)', self.section)
+        scenario = match.group(1) if match else self.section
+        self.records.append((scenario, self.section, message, passed, hint,
+                             now - self._mark))
+        self._mark = now
+
+
+RECORDER = None
+
+
+def current_repo_and_commit():
+    """Identify the graded repo (remote URL or path) and its HEAD commit."""
+    success, remote = run_command(["git", "config", "--get", "remote.origin.url"],
+                                  retries=0, timeout=10)
+    repo = remote.strip() if success and remote.strip() else os.path.abspath(".")
+    success, sha = run_command(["git", "rev-parse", "HEAD"], retries=0, timeout=10)
+    commit = sha.strip() if success else "unknown"
+    return repo, commit
+
+
+def open_results_db(path=RESULTS_DB):
+    """Open (creating if needed) the results store."""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    conn = sqlite3.connect(path, timeout=30)
+    conn.executescript(RESULTS_SCHEMA)
+    return conn
+
+
+def store_results(recorder, args, passed, total, percentage, path=RESULTS_DB):
+    """Append one run and its per-check outcomes to the results store."""
+    repo, commit = recorder.repo, recorder.commit
+    if repo is None:
+        repo, commit = current_repo_and_commit()
+    conn = open_results_db(path)
+    try:
+        with conn:
+            cursor = conn.execute(
+                "INSERT INTO runs (started_at, repo, commit_sha, mode, verify, "
+                "evidence, passed, total, score, duration) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (recorder.started_at, repo, commit, args.mode, int(args.verify),
+                 int(args.evidence), passed, total, percentage,
+                 time.time() - recorder.started_at))
+            run_id = cursor.lastrowid
+            conn.executemany(
+                "INSERT INTO results (run_id, repo, scenario, commit_sha, "
+                "section, check_name, passed, duration) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [(run_id, repo, scenario, commit, section, name, int(ok), duration)
+                 for scenario, section, name, ok, _, duration in recorder.records])
+    finally:
+        conn.close()
+    return run_id
+
+
+def show_history(repo=None, limit=10, path=RESULTS_DB,
+                 threshold=1.5, min_delta=0.5):
+    """Print score trend, per-scenario pass rates and slowed-down checks.
+
+    Only runs graded with the same mode/--verify/--evidence as the latest
+    one are compared, since each adds or drops whole groups of checks.
+    The last `limit` of them are compared against a baseline of up to
+    HISTORY_BASELINE_RUNS times as many runs before them; older results
+    are never read. A check has regressed when its mean duration over the
+    recent runs is `threshold` times its baseline mean and at least
+    `min_delta` seconds slower.
+    """
+    if not os.path.exists(path):
+        check_info(f"No results recorded yet ({path})")
+        return 0
+    if repo is None:
+        repo, _ = current_repo_and_commit()
+
+    conn = open_results_db(path)
+    try:
+        latest = conn.execute(
+            "SELECT mode, verify, evidence FROM runs WHERE repo = ? "
+            "ORDER BY id DESC LIMIT 1", (repo,)).fetchone()
+        if latest is None:
+            check_info(f"No runs recorded for {repo}")
+            return 0
+        same_config = "repo = ? AND mode = ? AND verify = ? AND evidence = ?"
+        config = (repo,) + tuple(latest)
+        window = conn.execute(
+            f"SELECT id FROM runs WHERE {same_config} ORDER BY id DESC LIMIT ?",
+            config + (limit * (1 + HISTORY_BASELINE_RUNS),)).fetchall()
+        oldest_recent = window[min(limit, len(window)) - 1][0]
+        oldest = window[-1][0]
+        runs = conn.execute(
+            "SELECT started_at, commit_sha, passed, total, score, duration "
+            f"FROM runs WHERE {same_config} AND id >= ? ORDER BY id",
+            config + (oldest_recent,)).fetchall()
+        # Results of comparable runs only
+        comparable = f"run_id IN (SELECT id FROM runs WHERE {same_config} AND id >= ?)"
+
+        mode, verify, evidence = latest
+        flags = "".join(f" {flag}" for flag, on in
+                        (("--verify", verify), ("--evidence", evidence)) if on)
+        print_section(f"Recent Runs ({repo}, --mode {mode}{flags})")
+        for started, commit, passed, total, score, duration in runs:
+            stamp = time.strftime("%Y-%m-%d %H:%M", time.localtime(started))
+            color = GREEN if score >= 80 else YELLOW if score >= 60 else RED
+            print(f"  {stamp}  {commit[:8]:8}  "
+                  f"{color}{score:5.1f}%{RESET}  ({passed}/{total}, {duration:.1f}s)")
+
+        print_section("Pass Rate by Scenario (recent vs earlier runs)")
+        rows = conn.execute(
+            "SELECT scenario, run_id >= ? AS is_recent, AVG(passed) "
+            f"FROM results WHERE {comparable} "
+            "GROUP BY scenario, is_recent ORDER BY scenario",
+            (oldest_recent,) + config + (oldest,)).fetchall()
+        rates = {}
+        for scenario, is_recent, rate in rows:
+            rates.setdefault(scenario, {})[bool(is_recent)] = rate * 100
+        for scenario, rate in rates.items():
+            label = f"Scenario {scenario}" if scenario.isdigit() else scenario
+            recent = rate.get(True)
+            earlier = rate.get(False)
+            line = f"  {label:30} {recent:5.1f}%" if recent is not None \
+                else f"  {label:30}    -  "
+            if recent is not None and earlier is not None:
+                delta = recent - earlier
+                color = GREEN if delta >= 0 else RED
+                line += f"  {color}({delta:+.1f} vs {earlier:.1f}%){RESET}"
+            print(line)
+
+        print_section("Runtime Regressions")
+        # The same check name (e.g. "terraform init succeeded") appears in
+        # several sections, so regressions are tracked per section
+        rows = conn.execute(
+            "SELECT section, check_name, "
+            "AVG(CASE WHEN run_id < ? THEN duration END) AS before, "
+            "AVG(CASE WHEN run_id >= ? THEN duration END) AS after "
+            f"FROM results WHERE {comparable} "
+            "GROUP BY section, check_name "
+            "HAVING after >= before * ? AND after - before >= ? "
+            "ORDER BY after - before DESC",
+            (oldest_recent, oldest_recent) + config + (oldest,
+             threshold, min_delta)).fetchall()
+        regressions = [(after - before, f"{section}: {name}", before, after)
+                       for section, name, before, after in rows]
+        if regressions:
+            for delta, name, before, after in regressions:
+                print(f"  {RED}▲{RESET} {name}: {before:.2f}s → {after:.2f}s")
+        else:
+            check_info("No checks slowed down")
+    finally:
+        conn.close()
+    return 0
+
+
+# =============================================================================
+# GRADING SERVICE
+# =============================================================================
+
+MAX_UPLOAD_BYTES = 50 * 1024 * 1024
+ANSI_ESCAPE = re.compile(r'\x1b\[[0-9;]*m')
+
+
+def _warm_worker(plugin_cache, slots):
+    """Worker initializer: claim a plugin cache and run env probes once.
+
+    Terraform's plugin cache is not safe for concurrent `terraform init`,
+    so each worker slot gets its own cache directory, kept across jobs and
+    pool restarts.
+    """
+    cache = os.path.join(plugin_cache, f"worker-{slots.get()}")
+    os.makedirs(cache, exist_ok=True)
+    os.environ["TF_PLUGIN_CACHE_DIR"] = cache
+    for probe in (check_terraform_installed, check_docker_running,
+                  check_localstack_running):
+        probe()
+
+
+def _grade_job(root, argv):
+    """Grade one repo inside a pool worker. Returns the result dict."""
+    reset_cancellation()
+    os.chdir(root)
+    args = build_parser().parse_args(argv)
+    buffer = io.StringIO()
+    with contextlib.redirect_stdout(buffer):
+        result = run_grading(args)
+    result["log"] = ANSI_ESCAPE.sub("", buffer.getvalue())
+    return result
+
+
+def _options_to_argv(options):
+    """Translate a JSON job request into run.py arguments."""
+    argv = ["--mode", str(options.get("mode", "localstack"))]
+    for flag in ("verify", "evidence", "all", "no_record"):
+        if options.get(flag):
+            argv.append("--" + flag.replace("_", "-"))
+    # Jobs share one host, so live verification is isolated by default
+    if options.get("sandbox", True):
+        argv.append("--sandbox")
+    endpoints = options.get("endpoints", [])
+    if not isinstance(endpoints, list) or \
+            not all(isinstance(e, str) for e in endpoints):
+        raise ValueError("'endpoints' must be a list of URLs")
+    for endpoint in endpoints:
+        argv += ["--endpoint", endpoint]
+    for key in ("repo", "commit"):
+        value = options.get(key)
+        if value is None:
+            continue
+        if not isinstance(value, str) or not value:
+            raise ValueError(f"'{key}' must be a non-empty string")
+        argv += ["--" + key, value]
+    return argv
+
+
+def _extract_tarball(data):
+    """Unpack an uploaded repo tarball. Returns (tempdir, repo root)."""
+    tmpdir = tempfile.mkdtemp(prefix="tfsm-job-")
+    with tarfile.open(fileobj=io.BytesIO(data), mode="r:*") as tar:
+        if hasattr(tarfile, "data_filter"):
+            tar.extractall(tmpdir, filter="data")
+        else:
+            for member in tar.getmembers():
+                target = os.path.realpath(os.path.join(tmpdir, member.name))
+                if not target.startswith(os.path.realpath(tmpdir) + os.sep) or \
+                        member.issym() or member.islnk():
+                    raise ValueError(f"Unsafe path in tarball: {member.name}")
+            tar.extractall(tmpdir)
+    entries = os.listdir(tmpdir)
+    if len(entries) == 1 and os.path.isdir(os.path.join(tmpdir, entries[0])):
+        return tmpdir, os.path.join(tmpdir, entries[0])
+    return tmpdir, tmpdir
+
+
+class GradingService:
+    """Queues grading jobs onto a bounded pool of warm worker processes.
+
+    Workers are long-lived, so interpreter start-up, the Terraform plugin
+    cache and the environment probes are paid once per worker rather than
+    once per job. Each worker grades one repo at a time, which keeps the
+    cwd-relative grading code unchanged. Finished jobs are kept for
+    `job_ttl` seconds, and at most `max_finished` of them.
+    """
+
+    def __init__(self, workers=2, max_queue=16, plugin_cache=None,
+                 job_ttl=3600, max_finished=1000):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.job_ttl = job_ttl
+        self.max_finished = max_finished
+        self.plugin_cache = plugin_cache or os.environ.get(
+            "TF_PLUGIN_CACHE_DIR",
+            os.path.join(Path.home(), ".terraform.d", "plugin-cache"))
+        os.makedirs(self.plugin_cache, exist_ok=True)
+        self.jobs = {}
+        self._lock = threading.Lock()
+        self._pending = 0
+        self.pool = self._new_pool()
+
+    def _new_pool(self):
+        # spawn, not fork: the HTTP server is already multi-threaded
+        context = multiprocessing.get_context("spawn")
+        slots = context.Queue()
+        for slot in range(self.workers):
+            slots.put(slot)
+        return ProcessPoolExecutor(max_workers=self.workers, mp_context=context,
+                                   initializer=_warm_worker,
+                                   initargs=(self.plugin_cache, slots))
+
+    def _submit_to_pool(self, root, argv):
+        """Submit to the pool, replacing it once if a worker has died."""
+        pool = self.pool
+        try:
+            return pool.submit(_grade_job, root, argv)
+        except BrokenProcessPool:
+            with self._lock:
+                if self.pool is pool:
+                    self.pool = self._new_pool()
+                    pool.shutdown(wait=False, cancel_futures=True)
+            return self.pool.submit(_grade_job, root, argv)
+
+    def _evict_locked(self):
+        """Drop expired finished jobs and cap how many are kept."""
+        cutoff = time.time() - self.job_ttl
+        finished = sorted((job["finished_at"], job_id)
+                          for job_id, job in self.jobs.items()
+                          if "finished_at" in job)
+        excess = len(finished) - self.max_finished
+        for index, (finished_at, job_id) in enumerate(finished):
+            if index < excess or finished_at < cutoff:
+                del self.jobs[job_id]
+
+    def _finish(self, job, cleanup, result=None, error=None):
+        with self._lock:
+            self._pending -= 1
+            if error is None:
+                job["result"] = result
+                job["status"] = "done"
+            else:
+                job["error"] = error
+                job["status"] = "failed"
+            job["finished_at"] = time.time()
+            self._evict_locked()
+        if cleanup:
+            shutil.rmtree(cleanup, ignore_errors=True)
+        job["_done"].set()
+
+    def submit(self, root, argv, cleanup=None):
+        """Queue a job. Returns its id, or None if the queue is full."""
+        with self._lock:
+            self._evict_locked()
+            if self._pending >= self.max_queue:
+                return None
+            self._pending += 1
+            job_id = uuid.uuid4().hex[:12]
+            job = {"id": job_id, "status": "queued",
+                   "submitted_at": time.time(), "_done": threading.Event()}
+            self.jobs[job_id] = job
+
+        try:
+            future = self._submit_to_pool(root, argv)
+        except Exception as e:
+            self._finish(job, cleanup, error=f"Could not start job: {e}")
+            return job_id
+
+        def finished(future):
+            try:
+                self._finish(job, cleanup, result=future.result())
+            except Exception as e:
+                self._finish(job, cleanup, error=str(e) or type(e).__name__)
+
+        future.add_done_callback(finished)
+        return job_id
+
+    def get(self, job_id):
+        with self._lock:
+            job = self.jobs.get(job_id)
+            if job is None:
+                return None
+            return {k: v for k, v in job.items() if not k.startswith("_")}
+
+    def wait(self, job_id):
+        with self._lock:
+            done = self.jobs[job_id]["_done"]
+        done.wait()
+        return self.get(job_id)
+
+    def status(self):
+        with self._lock:
+            return {"status": "ok", "workers": self.workers,
+                    "pending": self._pending, "max_queue": self.max_queue}
+
+    def shutdown(self):
+        self.pool.shutdown(wait=False, cancel_futures=True)
+
+
+class GradingRequestHandler(BaseHTTPRequestHandler):
+    """HTTP front end for GradingService.
+
+    POST /grade     JSON {"path": ..., "verify": ..., ...} or a repo tarball
+                    (options then come from the query string). Add ?wait=1
+                    to block until the result is ready. Tarball jobs are
+                    only recorded when ?repo= (and optionally ?commit=)
+                    says what was uploaded.
+    GET  /jobs/<id> Job status and, once done, the structured result.
+    GET  /health    Worker pool status.
+    """
+
+    service = None
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        sys.stderr.write(f"[grading-service] {self.address_string()} "
+                         f"{format % args}\n")
+
+    def do_GET(self):
+        path = urllib.parse.urlparse(self.path).path
+        if path == "/health":
+            self._send_json(200, self.service.status())
+        elif path.startswith("/jobs/"):
+            job = self.service.get(path[len("/jobs/"):])
+            if job is None:
+                self._send_json(404, {"error": "unknown job"})
+            else:
+                self._send_json(200, job)
+        else:
+            self._send_json(404, {"error": "not found"})
+
+    def do_POST(self):
+        url = urllib.parse.urlparse(self.path)
+        if url.path != "/grade":
+            self._send_json(404, {"error": "not found"})
+            return
+        query = {k: v[-1] for k, v in urllib.parse.parse_qs(url.query).items()}
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+        except ValueError:
+            length = -1
+        if length < 0:
+            self._send_json(400, {"error": "invalid Content-Length"})
+            return
+        if length > MAX_UPLOAD_BYTES:
+            self._send_json(413, {"error": "request too large"})
+            return
+        body = self.rfile.read(length)
+
+        cleanup = None
+        content_type = self.headers.get("Content-Type", "")
+        try:
+            if content_type.startswith("application/json"):
+                options = json.loads(body or b"{}")
+                if not isinstance(options, dict) or "path" not in options:
+                    raise ValueError("JSON body needs a 'path'")
+                root = os.path.abspath(options["path"])
+                if not os.path.isdir(root):
+                    raise ValueError(f"Not a directory: {options['path']}")
+            else:
+                options = {k: v.lower() in ("1", "true", "yes")
+                           if k not in ("mode", "repo", "commit") else v
+                           for k, v in query.items()}
+                # A temp dir is no identity to track history under
+                if "repo" not in options:
+                    options["no_record"] = True
+                cleanup, root = _extract_tarball(body)
+            argv = _options_to_argv(options)
+            build_parser().parse_args(argv)
+        except SystemExit:
+            self._send_json(400, {"error": "invalid grading options"})
+            return
+        except (ValueError, tarfile.TarError, OSError) as e:
+            if cleanup:
+                shutil.rmtree(cleanup, ignore_errors=True)
+            self._send_json(400, {"error": str(e)})
+            return
+
+        job_id = self.service.submit(root, argv, cleanup=cleanup)
+        if job_id is None:
+            if cleanup:
+                shutil.rmtree(cleanup, ignore_errors=True)
+            self._send_json(503, {"error": "queue full, retry later"})
+            return
+        if query.get("wait", "").lower() in ("1", "true", "yes"):
+            job = self.service.wait(job_id)
+        else:
+            job = self.service.get(job_id)
+        if job["status"] == "failed":
+            self._send_json(500, job)
+        else:
+            self._send_json(200 if job["status"] == "done" else 202, job)
+
+
+def make_server(service, host="127.0.0.1", port=8080):
+    """Build the HTTP server for a GradingService (port 0 picks a free one)."""
+    handler = type("Handler", (GradingRequestHandler,), {"service": service})
+    return ThreadingHTTPServer((host, port), handler)
+
+
+def serve(host="127.0.0.1", port=8080, workers=2, max_queue=16):
+    """Run the grading HTTP service until interrupted."""
+    service = GradingService(workers=workers, max_queue=max_queue)
+    server = make_server(service, host, port)
+    print_header("TERRAFORM STATE MIGRATION - GRADING SERVICE")
+    check_info(f"Listening on http://{host}:{server.server_port} "
+               f"({workers} worker(s), queue of {max_queue})")
+    check_info(f"Terraform plugin cache: {service.plugin_cache}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.shutdown()
+    return 0
+
+
 # =============================================================================
 # MAIN GRADING LOGIC
 # =============================================================================
 
-def main():
+def build_parser():
     parser = argparse.ArgumentParser(
         description="Grade Terraform State Migration Challenge",
         formatter_class=argparse.RawDescriptionHelpFormatter,
@@ -646,6 +1973,10 @@ Examples:
   python run.py --mode aws          # Check Real AWS setup
   python run.py --mode localstack   # Check LocalStack setup
   python run.py --all               # Run all checks
+  python run.py --verify --sandbox  # Isolated verification (parallel-safe)
+  python run.py --history           # Score trend and slowed-down checks
+  python run.py --discover          # Import commands for scenarios 2 and 5
+  python run.py --serve --port 8080 # HTTP grading service
         """
     )
     parser.add_argument('--verify', action='store_true',
@@ -656,8 +1987,55 @@ Examples:
                        help='Verification mode (default: localstack)')
     parser.add_argument('--all', action='store_true',
                        help='Run all checks')
-
-    args = parser.parse_args()
+    parser.add_argument('--history', action='store_true',
+                       help='Show pass-rate trends and runtime regressions '
+                            'from recorded runs instead of grading')
+    parser.add_argument('--repo',
+                       help='Repo to record this run under, or to show with '
+                            '--history (default: this one)')
+    parser.add_argument('--commit',
+                       help='Commit to record this run under '
+                            '(default: HEAD of this repo)')
+    parser.add_argument('--limit', type=int, default=10,
+                       help='Number of recent runs --history compares against '
+                            'earlier ones (default: 10)')
+    parser.add_argument('--results-db', default=RESULTS_DB, metavar='PATH',
+                       help=f'Results store (default: $TFSM_RESULTS_DB or {RESULTS_DB})')
+    parser.add_argument('--no-record', action='store_true',
+                       help='Do not record this run in the results store')
+    parser.add_argument('--discover', action='store_true',
+                       help='Look up the IDs of the resources created by the '
+                            'scenario 2/5 setup scripts and print the '
+                            'terraform import commands')
+    parser.add_argument('--sandbox', action='store_true',
+                       help='Verify in isolated per-run buckets so several '
+                            'gradings can share one host')
+    parser.add_argument('--endpoint', action='append', dest='endpoints',
+                       metavar='URL',
+                       help='LocalStack endpoint for --sandbox (repeat for a '
+                            'pool; default: $LOCALSTACK_ENDPOINTS or '
+                            f'{LOCALSTACK_ENDPOINT})')
+    parser.add_argument('--serve', action='store_true',
+                       help='Run as a local HTTP grading service')
+    parser.add_argument('--host', default='127.0.0.1',
+                       help='Address for --serve (default: 127.0.0.1)')
+    parser.add_argument('--port', type=int, default=8080,
+                       help='Port for --serve (default: 8080)')
+    parser.add_argument('--workers', type=int, default=2,
+                       help='Grading worker processes for --serve (default: 2)')
+    parser.add_argument('--queue', type=int, default=16,
+                       help='Max queued jobs for --serve (default: 16)')
+    return parser
+
+
+def run_grading(args):
+    """Grade the repo in the current directory and return the results."""
+    global RECORDER
+    RECORDER = ResultRecorder()
+    if not args.no_record:
+        repo, commit = current_repo_and_commit()
+        RECORDER.repo = args.repo or repo
+        RECORDER.commit = args.commit or commit
 
     if args.all:
         args.verify = True
@@ -666,6 +2044,7 @@ Examples:
     print_header("TERRAFORM STATE MIGRATION - GRADING SCRIPT")
 
     # Environment checks
+    RECORDER.scored = False
     print_section("Environment Check")
 
     all_checks = []
@@ -700,13 +2079,10 @@ Examples:
     # FILE-BASED CHECKS (Always run)
     # =================================
 
+    RECORDER.scored = True
     print_header("FILE-BASED CHECKS")
 
-    all_checks.extend(grade_scenario_1_files())
-    all_checks.extend(grade_scenario_2_files())
-    all_checks.extend(grade_scenario_3_files())
-    all_checks.extend(grade_scenario_4_files())
-    all_checks.extend(grade_scenario_5_files())
+    all_checks.extend(grade_file_checks())
 
     # =================================
     # LIVE VERIFICATION (Optional)
@@ -715,15 +2091,41 @@ Examples:
     if args.verify:
         print_header(f"LIVE VERIFICATION ({args.mode.upper()})")
 
-        if args.mode == "localstack" and not check_localstack_running():
+        sandbox = None
+        if args.sandbox:
+            print_section("Sandbox Isolation")
+        if args.sandbox and args.mode == "localstack":
+            pool = args.endpoints or [
+                e.strip() for e in
+                os.environ.get("LOCALSTACK_ENDPOINTS", LOCALSTACK_ENDPOINT).split(",")
+                if e.strip()
+            ]
+            healthy = [e for e in pool if check_endpoint_healthy(e)]
+            if healthy:
+                sandbox = LocalStackSandbox(healthy, isolated=True)
+                check_info(f"Sandbox run {sandbox.run_id} "
+                           f"({len(healthy)} endpoint(s) available)")
+        elif args.sandbox:
+            check_info("--sandbox only applies to LocalStack; ignored in aws mode")
+
+        if args.sandbox and args.mode == "localstack" and sandbox is None:
+            # Falling back to the shared buckets would let concurrent runs
+            # overwrite each other's state - exactly what --sandbox prevents
+            all_checks.append(check_failed(
+                "Sandbox isolation available",
+                f"No healthy LocalStack endpoint in: {', '.join(pool)}"))
+        elif args.mode == "localstack" and sandbox is None and \
+                not check_localstack_running():
             print(f"\n{YELLOW}⚠ LocalStack not running. Start with: docker-compose up -d{RESET}")
         elif args.mode == "aws" and not check_aws_configured():
             print(f"\n{YELLOW}⚠ AWS not configured. Run: aws configure{RESET}")
         else:
-            all_checks.extend(verify_scenario_1_live(args.mode))
-            all_checks.extend(verify_scenario_2_live(args.mode))
-            all_checks.extend(verify_scenario_4_live(args.mode))
-            all_checks.extend(verify_scenario_5_live(args.mode))
+            all_checks.extend(run_live_verifiers([
+                verify_scenario_1_live,
+                verify_scenario_2_live,
+                verify_scenario_4_live,
+                verify_scenario_5_live,
+            ], args.mode, sandbox))
 
     # =================================
     # EVIDENCE CHECKS (Optional)
@@ -747,6 +2149,13 @@ Examples:
     print(f"  Checks Passed: {GREEN}{passed}{RESET} / {total}")
     print(f"  Score: {BOLD}{percentage:.1f}%{RESET}")
 
+    if not args.no_record:
+        try:
+            store_results(RECORDER, args, passed, total, percentage,
+                          path=args.results_db)
+        except (sqlite3.Error, OSError) as e:
+            print(f"  {YELLOW}⚠ Could not record results: {e}{RESET}")
+
     # Progress bar
     bar_width = 40
     filled = int(bar_width * passed / total) if total > 0 else 0
@@ -783,7 +2192,37 @@ Examples:
 
     print()
 
-    return 0 if percentage >= 60 else 1
+    return {
+        "passed": passed,
+        "total": total,
+        "score": round(percentage, 1),
+        "grade": grade,
+        "exit_code": 0 if percentage >= 60 else 1,
+        "checks": [
+            {"scenario": scenario, "section": section, "name": name,
+             "passed": ok, "hint": hint, "duration": round(duration, 3)}
+            for scenario, section, name, ok, hint, duration in RECORDER.records
+        ],
+    }
+
+
+def main():
+    args = build_parser().parse_args()
+
+    if args.history:
+        print_header("GRADING HISTORY")
+        return show_history(repo=args.repo, limit=args.limit,
+                            path=args.results_db)
+
+    if args.discover:
+        print_header(f"RESOURCE DISCOVERY ({args.mode.upper()})")
+        return show_import_commands(args.mode)
+
+    if args.serve:
+        return serve(args.host, args.port, workers=args.workers,
+                     max_queue=args.queue)
+
+    return run_grading(args)["exit_code"]
 
 
 if __name__ == "__main__":
@@ -0,0 +1,37 @@
+import os
+import stat
+import sys
+
+import pytest
+
+# run.py is a standalone script at the repo root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import run  # noqa: E402
+
+
+@pytest.fixture
+def stub_bin(tmp_path, monkeypatch):
+    """Put a directory of stub tool binaries first on PATH.
+
+    Returns write(name, script) which creates an executable shell stub.
+    """
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    monkeypatch.setenv("PATH", f"{bin_dir}{os.pathsep}{os.environ['PATH']}")
+
+    def write(name, script):
+        path = bin_dir / name
+        path.write_text("#!/bin/sh\n" + script)
+        path.chmod(path.stat().st_mode | stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH)
+        return path
+
+    return write
+
+
+@pytest.fixture(autouse=True)
+def clean_run_state():
+    run.reset_cancellation()
+    run._probe_cache.clear()
+    yield
+    run.reset_cancellation()
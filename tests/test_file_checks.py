@@ -0,0 +1,138 @@
+import pytest
+
+import run
+
+
+def scenario(*checks, base="s"):
+    return {"scenario": "9", "title": "Scenario 9: Test (Files)",
+            "base": base, "checks": list(checks)}
+
+
+@pytest.fixture
+def tree(tmp_path, monkeypatch):
+    """Write files under tmp_path/s and chdir there."""
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "s").mkdir()
+
+    def write(name, content=""):
+        path = tmp_path / "s" / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content)
+
+    return write
+
+
+def grade(*checks):
+    return run.grade_file_checks([scenario(*checks)])
+
+
+def test_predicates(tree):
+    tree("main.tf", '# backend "s3" {}\nresource "aws_instance" "web" {}\n')
+    tree("a.sh")
+    assert grade(
+        {"id": "exists", "test": ("exists", "main.tf"), "name": "e"},
+        {"id": "missing", "test": ("exists", "nope.tf"), "name": "m"},
+        {"id": "any", "test": ("any_exists", "nope.sh", "a.sh"), "name": "a"},
+        {"id": "all", "test": ("all_exists", "main.tf", "nope.sh"), "name": "l"},
+        {"id": "has", "test": ("contains", "main.tf", "aws_instance"), "name": "c"},
+        # Commented-out Terraform doesn't count
+        {"id": "comment", "test": ("contains", "main.tf", 'backend "s3"'),
+         "name": "b"},
+    ) == [True, False, True, False, True, False]
+
+
+def test_failed_gate_skips_the_rest_of_the_scenario(tree, capsys):
+    tree("later.tf")
+    checks = grade(
+        {"id": "gate", "test": ("exists", "main.tf"), "name": "main.tf exists",
+         "gate": True, "hint": "Create main.tf"},
+        {"id": "later", "test": ("exists", "later.tf"), "name": "later exists"},
+    )
+    out = capsys.readouterr().out
+    assert checks == [False]
+    assert "Hint: Create main.tf" in out
+    assert "later exists" not in out
+
+
+def test_requires_skips_only_dependents(tree, capsys):
+    tree("other.tf")
+    checks = grade(
+        {"id": "state", "test": ("exists", "terraform.tfstate"), "name": "state",
+         "fail_info": "State not yet recovered"},
+        {"id": "bonus", "requires": ["state"], "info": True,
+         "test": ("exists", "other.tf"), "name": "bonus info"},
+        {"id": "other", "test": ("exists", "other.tf"), "name": "other exists"},
+    )
+    out = capsys.readouterr().out
+    # fail_info and info checks are not counted
+    assert checks == [True]
+    assert "State not yet recovered" in out
+    assert "bonus info" not in out
+    assert "other exists" in out
+
+
+def test_info_check_prints_on_pass_without_counting(tree, capsys):
+    tree("terraform.tfstate", "aws_instance.web")
+    checks = grade(
+        {"id": "state", "test": ("exists", "terraform.tfstate"), "name": "state"},
+        {"id": "web", "requires": ["state"], "info": True,
+         "test": ("contains", "terraform.tfstate", "aws_instance.web"),
+         "name": "State contains aws_instance.web"},
+    )
+    assert checks == [True]
+    assert "State contains aws_instance.web" in capsys.readouterr().out
+
+
+def test_fail_message_differs_from_pass_message(tree, capsys):
+    tree("backend.tf", "terraform {}\n")
+    grade({"id": "bucket", "test": ("contains", "backend.tf", "bucket"),
+           "name": "Bucket specified in backend", "fail": "Bucket specified",
+           "hint": "Add: bucket"})
+    out = capsys.readouterr().out
+    assert "Bucket specified\n" in out
+    assert "in backend" not in out
+
+
+def test_each_file_is_read_once(tree, monkeypatch):
+    tree("main.tf", "aws_instance aws_ebs_volume aws_security_group")
+    reads = []
+    original = run._read_for_matching
+    monkeypatch.setattr(run, "_read_for_matching",
+                        lambda path: reads.append(path) or original(path))
+    grade(*[{"id": kind, "test": ("contains", "main.tf", kind), "name": kind}
+            for kind in ("aws_instance", "aws_ebs_volume", "aws_security_group")])
+    assert reads == ["s/main.tf"]
+
+
+@pytest.mark.parametrize("requires", [["nope"], ["later"], ["self"]])
+def test_requires_must_name_an_earlier_check(requires):
+    registry = [scenario(
+        {"id": "self", "test": ("exists", "a"), "name": "a", "requires": requires},
+        {"id": "later", "test": ("exists", "b"), "name": "b"},
+    )]
+    with pytest.raises(ValueError, match="requires unknown or later check"):
+        run.compile_file_checks(registry)
+
+
+def test_unknown_predicate_is_rejected(tree):
+    with pytest.raises(ValueError, match="Unknown check predicate: glob"):
+        grade({"id": "x", "test": ("glob", "*.tf"), "name": "x"})
+
+
+def test_compile_expands_gates_and_collects_paths():
+    scenarios, paths = run.compile_file_checks([scenario(
+        {"id": "gate", "test": ("exists", "main.tf"), "name": "g", "gate": True},
+        {"id": "a", "test": ("any_exists", "x.sh", "x.ps1"), "name": "a"},
+        {"id": "b", "requires": ["a"], "test": ("contains", "main.tf", "y"),
+         "name": "b"},
+    )])
+    assert [c["requires"] for c in scenarios[0]["checks"]] == \
+        [[], ["gate"], ["gate", "a"]]
+    assert paths == {"s/main.tf", "s/x.sh", "s/x.ps1"}
+
+
+def test_registry_ids_are_unique_per_scenario():
+    for entry in run.FILE_CHECKS:
+        ids = [check["id"] for check in entry["checks"]]
+        assert len(ids) == len(set(ids)), entry["scenario"]
+    run.compile_file_checks(run.FILE_CHECKS)
@@ -0,0 +1,115 @@
+import argparse
+import os
+import sqlite3
+
+import pytest
+
+import run
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def fixed_repo(monkeypatch):
+    monkeypatch.setattr(run, "current_repo_and_commit",
+                        lambda: ("example/repo", "abc123"))
+
+
+@pytest.fixture
+def offline_tools(stub_bin):
+    """Grade without probing the real terraform, docker and aws."""
+    for tool in ("terraform", "docker", "aws"):
+        stub_bin(tool, "exit 0\n")
+
+
+def store(db, checks, verify=True):
+    """Record one fake run; checks is [(section, name, passed, duration)]."""
+    recorder = run.ResultRecorder()
+    for section, name, passed, duration in checks:
+        recorder.records.append(("1", section, name, passed, "", duration))
+    args = argparse.Namespace(mode="localstack", verify=verify, evidence=False)
+    passed = sum(c[2] for c in checks)
+    run.store_results(recorder, args, passed, len(checks),
+                      100.0 * passed / len(checks), path=str(db))
+
+
+def test_only_scored_checks_are_stored(tmp_path, fixed_repo, offline_tools,
+                                      monkeypatch):
+    db = tmp_path / "results.db"
+    monkeypatch.chdir(REPO)
+    args = run.build_parser().parse_args(["--results-db", str(db)])
+    result = run.run_grading(args)
+
+    conn = sqlite3.connect(db)
+    total, passed = conn.execute("SELECT total, passed FROM runs").fetchone()
+    rows = conn.execute("SELECT section, passed FROM results").fetchall()
+    assert (total, passed) == (result["total"], result["passed"])
+    assert len(rows) == total
+    assert sum(ok for _, ok in rows) == passed
+    assert not [s for s, _ in rows if s == "Environment Check"]
+
+
+def test_history_reports_regressed_checks(tmp_path, fixed_repo, capsys):
+    db = tmp_path / "results.db"
+    for _ in range(3):
+        store(db, [("Scenario 1: Live", "terraform init succeeded", True, 1.0),
+                   ("Scenario 2: Live", "terraform init succeeded", True, 1.0)])
+    store(db, [("Scenario 1: Live", "terraform init succeeded", True, 4.0),
+               ("Scenario 2: Live", "terraform init succeeded", False, 1.1)])
+
+    run.show_history(limit=1, path=str(db))
+    out = capsys.readouterr().out
+    assert "Scenario 1: Live: terraform init succeeded: 1.00s → 4.00s" in out
+    assert "Scenario 2: Live" not in out.split("Runtime Regressions")[1]
+    assert "Scenario 1" in out and "50.0%" in out
+
+
+def test_history_ignores_runs_outside_baseline_window(tmp_path, fixed_repo,
+                                                      capsys, monkeypatch):
+    monkeypatch.setattr(run, "HISTORY_BASELINE_RUNS", 2)
+    db = tmp_path / "results.db"
+    # Ancient fast run, then a slow baseline and recent run
+    store(db, [("S", "check", True, 0.1)])
+    for _ in range(3):
+        store(db, [("S", "check", True, 5.0)])
+
+    run.show_history(limit=1, path=str(db))
+    assert "No checks slowed down" in capsys.readouterr().out
+
+
+def test_aborted_verification_is_recorded_with_repo_and_section(
+        tmp_path, offline_tools, monkeypatch):
+    db = tmp_path / "results.db"
+    monkeypatch.chdir(REPO)
+    expected = run.current_repo_and_commit()
+    monkeypatch.setattr(run, "check_localstack_running", lambda: True)
+
+    def boom(mode, sandbox):
+        raise RuntimeError("boom")
+    monkeypatch.setattr(run, "verify_scenario_1_live", boom)
+    args = run.build_parser().parse_args(["--verify", "--results-db", str(db)])
+    run.run_grading(args)
+
+    conn = sqlite3.connect(db)
+    repo, commit = conn.execute("SELECT repo, commit_sha FROM runs").fetchone()
+    assert (repo, commit) == expected
+    assert commit != "unknown"
+    assert conn.execute(
+        "SELECT scenario, section FROM results WHERE check_name = ?",
+        ("Live verification aborted: boom",)).fetchone() == \
+        ("Live Verification", "Live Verification")
+
+
+def test_history_compares_runs_with_the_same_flags(tmp_path, fixed_repo, capsys):
+    db = tmp_path / "results.db"
+    store(db, [("Scenario 1: Live", "terraform init succeeded", False, 9.0)])
+    store(db, [("Scenario 1: Files", "backend.tf exists", True, 0.1)],
+          verify=False)
+    store(db, [("Scenario 1: Live", "terraform init succeeded", True, 1.0)])
+
+    run.show_history(limit=1, path=str(db))
+    out = capsys.readouterr().out
+    assert "--mode localstack --verify" in out
+    assert "100.0%  (0.0 vs 0.0%)" not in out
+    assert "(+100.0 vs 0.0%)" in out
+    assert "Scenario 1: Files" not in out
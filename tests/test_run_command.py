@@ -0,0 +1,141 @@
+import os
+import threading
+import time
+
+import pytest
+
+import run
+
+pytestmark = pytest.mark.skipif(os.name != "posix", reason="uses sh stubs")
+
+
+def is_running(pid):
+    """True if pid is alive and not just a zombie awaiting its reaper."""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            return f.read().rsplit(")", 1)[1].split()[0] != "Z"
+    except OSError:
+        return True
+
+
+def flaky(stub_bin, tmp_path, name, failures, message):
+    """Stub that prints `message` and fails `failures` times, then succeeds."""
+    counter = tmp_path / f"{name}.count"
+    stub_bin(name, f"""
+n=$(cat {counter} 2>/dev/null || echo 0)
+n=$((n + 1))
+echo $n > {counter}
+if [ $n -le {failures} ]; then echo "{message}"; exit 1; fi
+echo ok
+""")
+    return lambda: int(counter.read_text())
+
+
+def test_runs_argv_without_shell(stub_bin):
+    stub_bin("terraform", 'echo "args: $*"\n')
+    success, output = run.run_command(["terraform", "plan", "$HOME;", "a b"])
+    assert success
+    assert output == "args: plan $HOME; a b\n"
+
+
+def test_string_commands_are_split(stub_bin):
+    stub_bin("terraform", 'echo "$#"\n')
+    assert run.run_command("terraform state 'list x'") == (True, "2\n")
+
+
+def test_missing_binary():
+    success, output = run.run_command(["no-such-tool-xyz"])
+    assert not success
+    assert output == "Command not found: no-such-tool-xyz"
+
+
+def test_transient_error_is_retried(stub_bin, tmp_path):
+    attempts = flaky(stub_bin, tmp_path, "aws", 2, "Could not connect to the endpoint URL")
+    assert run.run_command(["aws", "s3", "ls"], backoff=0.01) == (True, "ok\n")
+    assert attempts() == 3
+
+
+def test_retries_are_bounded(stub_bin, tmp_path):
+    attempts = flaky(stub_bin, tmp_path, "aws", 10, "connection refused")
+    success, output = run.run_command(["aws"], retries=2, backoff=0.01)
+    assert not success
+    assert "connection refused" in output
+    assert attempts() == 3
+
+
+def test_lock_contention_has_its_own_budget(stub_bin, tmp_path):
+    attempts = flaky(stub_bin, tmp_path, "terraform", 4, "Error acquiring the state lock")
+    success, _ = run.run_command(["terraform", "plan"], retries=0,
+                                 lock_retries=5, backoff=0.01)
+    assert success
+    assert attempts() == 5
+
+
+def test_permanent_error_is_not_retried(stub_bin, tmp_path):
+    attempts = flaky(stub_bin, tmp_path, "terraform", 10, "Error: Invalid resource type")
+    success, _ = run.run_command(["terraform", "plan"], backoff=0.01)
+    assert not success
+    assert attempts() == 1
+
+
+def test_backoff_is_exponential(stub_bin, tmp_path, monkeypatch):
+    flaky(stub_bin, tmp_path, "aws", 3, "Throttling: Rate exceeded")
+    delays = []
+
+    class RecordingEvent:
+        def is_set(self):
+            return False
+
+        def wait(self, delay):
+            delays.append(delay)
+            return False
+
+    monkeypatch.setattr(run, "CANCEL_EVENT", RecordingEvent())
+    assert run.run_command(["aws"], retries=3, backoff=0.5)[0]
+    assert delays == [0.5, 1.0, 2.0]
+
+
+def test_timeout_kills_process_group(stub_bin, tmp_path):
+    pid_file = tmp_path / "child.pid"
+    stub_bin("terraform", f"sleep 30 &\necho $! > {pid_file}\nwait\n")
+    start = time.monotonic()
+    assert run.run_command(["terraform", "init"], timeout=1) == \
+        (False, "Command timed out")
+    assert time.monotonic() - start < 5
+    time.sleep(0.2)
+    assert not is_running(int(pid_file.read_text()))
+
+
+def test_timeout_covers_background_children(stub_bin):
+    stub_bin("terraform", "sleep 30 &\necho hi\n")
+    start = time.monotonic()
+    assert run.run_command(["terraform"], timeout=1) == (False, "Command timed out")
+    assert time.monotonic() - start < 5
+
+
+def test_cancel_stops_in_flight_command(stub_bin):
+    stub_bin("terraform", "sleep 30\n")
+    threading.Timer(0.3, run.cancel_all_commands).start()
+    start = time.monotonic()
+    assert run.run_command(["terraform", "plan"]) == (False, "Command cancelled")
+    assert time.monotonic() - start < 5
+
+
+def test_cancel_interrupts_backoff(stub_bin, tmp_path):
+    flaky(stub_bin, tmp_path, "aws", 10, "connection refused")
+    threading.Timer(0.3, run.cancel_all_commands).start()
+    start = time.monotonic()
+    assert run.run_command(["aws"], backoff=30) == (False, "Command cancelled")
+    assert time.monotonic() - start < 5
+
+
+def test_cancelled_commands_do_not_start(stub_bin, tmp_path):
+    attempts = flaky(stub_bin, tmp_path, "aws", 0, "")
+    run.cancel_all_commands()
+    assert run.run_command(["aws"]) == (False, "Command cancelled")
+    with pytest.raises(FileNotFoundError):
+        attempts()
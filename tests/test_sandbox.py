@@ -0,0 +1,162 @@
+import os
+import re
+
+import pytest
+
+import run
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BACKEND_A = os.path.join(REPO, "scenario-4-backend-migration", "backend-a.tf")
+
+pytestmark = pytest.mark.skipif(os.name != "posix", reason="uses sh stubs")
+
+
+def read(path):
+    with open(path, encoding="utf-8") as f:
+        return f.read()
+
+
+def settings(text):
+    """Non-comment `name = value` lines of a Terraform file."""
+    return {m.group(1): m.group(2).strip() for m in
+            re.finditer(r'^\s*(\w+)\s*=\s*(.+)$', text, re.M)}
+
+
+def test_redirect_keeps_every_other_backend_setting():
+    original = read(BACKEND_A)
+    redirected = run.redirect_s3_backend(original, "run1-tfstate-bucket-a",
+                                         "http://localhost:4600")
+    before, after = settings(original), settings(redirected)
+    assert after.pop("bucket") == '"run1-tfstate-bucket-a"'
+    assert after.pop("s3") == '"http://localhost:4600"'
+    before.pop("bucket")
+    before.pop("s3")
+    assert after == before
+
+
+def test_commented_backend_is_not_active():
+    template = read(os.path.join(REPO, "scenario-1-local-to-remote", "backend.tf"))
+    assert run.find_s3_backend_block(template) is None
+    assert run.redirect_s3_backend(template, "x", "http://e") == template
+
+
+def test_redirect_adds_missing_endpoint():
+    text = 'terraform {\n  backend "s3" {\n    bucket = "b"\n  }\n}\n'
+    out = run.redirect_s3_backend(text, "x", "http://e")
+    assert 'bucket = "x"' in out
+    assert 'endpoints = { s3 = "http://e" }' in out
+    assert run.find_s3_backend_block(out) == (1, 4)
+
+
+def test_redirect_rewrites_one_line_endpoints():
+    text = ('terraform {\n  backend "s3" {\n    bucket = "b"\n'
+            '    endpoints = { s3 = "http://localhost:4566" }\n  }\n}\n')
+    out = run.redirect_s3_backend(text, "x", "http://e")
+    assert 'endpoints = { s3 = "http://e" }' in out
+    assert out.count("endpoints") == 1
+
+
+def test_redirect_adds_s3_to_existing_endpoints():
+    text = ('terraform {\n  backend "s3" {\n    bucket = "b"\n'
+            '    endpoints = {\n      sts = "http://sts"\n    }\n  }\n}\n')
+    out = run.redirect_s3_backend(text, "x", "http://e")
+    assert out.count("endpoints") == 1
+    assert 's3 = "http://e"' in out
+    assert 'sts = "http://sts"' in out
+
+
+def test_redirect_rewrites_legacy_endpoint():
+    text = ('terraform {\n  backend "s3" {\n    bucket   = "b"\n'
+            '    endpoint = "http://localhost:4566"\n  }\n}\n')
+    out = run.redirect_s3_backend(text, "x", "http://e")
+    assert 'endpoint = "http://e"' in out
+    assert "endpoints" not in out
+
+
+@pytest.fixture
+def aws_stub(stub_bin, tmp_path):
+    log = tmp_path / "aws.log"
+    stub_bin("aws", f'echo "$*" >> {log}\n')
+    return log
+
+
+def test_prepare_rewrites_backend_in_workspace_copy(aws_stub, monkeypatch):
+    monkeypatch.chdir(REPO)
+    base = "scenario-4-backend-migration"
+    with run.LocalStackSandbox(["http://localhost:4600"], isolated=True,
+                               run_id="t1") as sandbox:
+        workdir = sandbox.prepare(base)
+        assert not os.path.exists(os.path.join(workdir, "sandbox_override.tf"))
+        copied = read(os.path.join(workdir, "backend-a.tf"))
+        assert 'bucket = "t1-tfstate-bucket-a"' in copied
+        assert 's3 = "http://localhost:4600"' in copied
+        assert 'key    = "scenario-4/terraform.tfstate"' in copied
+        # The student's own files are untouched
+        assert 'bucket = "tfstate-bucket-a"' in read(BACKEND_A)
+    calls = aws_stub.read_text().splitlines()
+    assert calls[0] == "s3 mb s3://t1-tfstate-bucket-a --endpoint-url http://localhost:4600"
+    assert calls[1] == ("s3api head-bucket --bucket tfstate-bucket-a "
+                        "--endpoint-url http://localhost:4566")
+    assert calls[2].startswith("s3 sync s3://tfstate-bucket-a ")
+    assert calls[-1] == ("s3 rb s3://t1-tfstate-bucket-a --force "
+                         "--endpoint-url http://localhost:4600")
+    assert not os.path.exists(workdir)
+
+
+def test_prepare_fails_when_bucket_cannot_be_created(stub_bin, monkeypatch):
+    stub_bin("aws", "echo AccessDenied; exit 1\n")
+    monkeypatch.chdir(REPO)
+    with run.LocalStackSandbox(["http://localhost:4600"], isolated=True) as sandbox:
+        with pytest.raises(RuntimeError, match="Could not create sandbox bucket"):
+            sandbox.prepare("scenario-4-backend-migration")
+
+
+def test_sandbox_without_healthy_endpoint_fails_instead_of_sharing(
+        monkeypatch, capsys):
+    monkeypatch.chdir(REPO)
+    monkeypatch.setattr(run, "check_endpoint_healthy", lambda endpoint: False)
+    monkeypatch.setattr(run, "run_live_verifiers", lambda *a, **k: pytest.fail(
+        "verified against shared buckets"))
+    args = run.build_parser().parse_args(
+        ["--verify", "--sandbox", "--no-record", "--endpoint", "http://x:1"])
+    result = run.run_grading(args)
+    failed = [c for c in result["checks"] if not c["passed"]]
+    assert any(c["name"] == "Sandbox isolation available" for c in failed)
+
+
+def write_backend(root, bucket):
+    scenario = root / "scenario-x"
+    scenario.mkdir()
+    (scenario / "backend.tf").write_text(
+        f'terraform {{\n  backend "s3" {{\n    bucket = {bucket}\n  }}\n}}\n')
+    return scenario.name
+
+
+def test_prepare_refuses_non_literal_bucket(aws_stub, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    base = write_backend(tmp_path, "var.state_bucket")
+    with run.LocalStackSandbox(["http://localhost:4600"], isolated=True) as sandbox:
+        with pytest.raises(RuntimeError, match="not a string literal"):
+            sandbox.prepare(base)
+
+
+def test_prepare_fails_when_existing_state_cannot_be_copied(
+        stub_bin, tmp_path, monkeypatch):
+    stub_bin("aws", 'case "$*" in "s3 sync"*) echo AccessDenied; exit 1;; esac\n')
+    monkeypatch.chdir(tmp_path)
+    base = write_backend(tmp_path, '"b"')
+    with run.LocalStackSandbox(["http://localhost:4600"], isolated=True) as sandbox:
+        with pytest.raises(RuntimeError, match="Could not copy state from s3://b"):
+            sandbox.prepare(base)
+
+
+def test_prepare_starts_empty_when_source_bucket_is_missing(
+        stub_bin, tmp_path, monkeypatch):
+    stub_bin("aws", 'case "$*" in "s3api head-bucket"*) exit 254;; '
+                    '"s3 sync"*) exit 1;; esac\n')
+    monkeypatch.chdir(tmp_path)
+    base = write_backend(tmp_path, '"b"')
+    with run.LocalStackSandbox(["http://localhost:4600"], isolated=True,
+                               run_id="t2") as sandbox:
+        workdir = sandbox.prepare(base)
+        assert 'bucket = "t2-b"' in read(os.path.join(workdir, "backend.tf"))
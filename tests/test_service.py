@@ -0,0 +1,245 @@
+import http.client
+import io
+import json
+import os
+import signal
+import sqlite3
+import tarfile
+import threading
+import time
+import urllib.error
+import urllib.request
+
+import pytest
+
+import run
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+pytestmark = pytest.mark.skipif(os.name != "posix", reason="uses sh stubs")
+
+
+@pytest.fixture
+def tools(stub_bin, tmp_path, monkeypatch):
+    """Offline stand-ins for terraform, docker and aws."""
+    stub_bin("terraform", 'if [ "$1" = init ]; then sleep 3; fi\n'
+                          'echo "Terraform v1.6.0"\n')
+    stub_bin("docker", 'echo localstack-state-migration\n')
+    stub_bin("aws", 'echo "{}"\n')
+    # Workers are spawned and read these at import; nothing may be written
+    # into the checkout or the real home directory
+    monkeypatch.setenv("TFSM_RESULTS_DB", str(tmp_path / "results.db"))
+    monkeypatch.setenv("TFSM_DISCOVERY_CACHE", str(tmp_path / "discovery.json"))
+
+
+def start(tmp_path, **kwargs):
+    service = run.GradingService(plugin_cache=str(tmp_path / "plugins"),
+                                 **kwargs)
+    server = run.make_server(service, port=0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return service, server, f"http://127.0.0.1:{server.server_port}"
+
+
+@pytest.fixture
+def service(tools, tmp_path):
+    service, server, url = start(tmp_path, workers=1, max_queue=4)
+    yield service, url
+    server.shutdown()
+    server.server_close()
+    service.shutdown()
+
+
+def request(url, body=None, content_type="application/json"):
+    """Returns (status, decoded JSON body)."""
+    data = json.dumps(body).encode() if isinstance(body, dict) else body
+    req = urllib.request.Request(url, data=data)
+    if data is not None:
+        req.add_header("Content-Type", content_type)
+    try:
+        with urllib.request.urlopen(req, timeout=60) as response:
+            return response.status, json.load(response)
+    except urllib.error.HTTPError as e:
+        return e.code, json.load(e)
+
+
+def make_tarball(members=None):
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode="w:gz") as tar:
+        if members is None:
+            for name in os.listdir(REPO):
+                if name.startswith("scenario-"):
+                    tar.add(os.path.join(REPO, name), f"repo/{name}")
+        else:
+            for name, content in members.items():
+                info = tarfile.TarInfo(name)
+                info.size = len(content)
+                tar.addfile(info, io.BytesIO(content))
+    return buffer.getvalue()
+
+
+def test_health(service):
+    _, url = service
+    assert request(f"{url}/health") == (200, {
+        "status": "ok", "workers": 1, "pending": 0, "max_queue": 4})
+
+
+def test_grade_path_and_wait(service):
+    _, url = service
+    status, job = request(f"{url}/grade?wait=1",
+                          {"path": REPO, "no_record": True})
+    assert status == 200
+    assert job["status"] == "done"
+    result = job["result"]
+    assert result["total"] == len(result["checks"]) > 0
+    assert result["passed"] == sum(c["passed"] for c in result["checks"])
+    assert "FILE-BASED CHECKS" in result["log"]
+    assert "\x1b[" not in result["log"]
+
+
+def test_grade_path_async_then_poll(service):
+    _, url = service
+    status, job = request(f"{url}/grade", {"path": REPO, "no_record": True})
+    assert status in (200, 202)
+    for _ in range(300):
+        status, job = request(f"{url}/jobs/{job['id']}")
+        if job["status"] != "queued":
+            break
+        time.sleep(0.1)
+    assert (status, job["status"]) == (200, "done")
+
+
+def test_grade_tarball(service):
+    _, url = service
+    status, job = request(f"{url}/grade?wait=1&no_record=1", make_tarball(),
+                          content_type="application/gzip")
+    assert (status, job["status"]) == (200, "done")
+    assert job["result"]["score"] > 0
+
+
+def recorded_runs(tmp_path):
+    db = tmp_path / "results.db"
+    if not db.exists():
+        return []
+    with sqlite3.connect(db) as conn:
+        return conn.execute("SELECT repo, commit_sha FROM runs").fetchall()
+
+
+def test_tarball_is_recorded_only_under_a_given_repo(service, tmp_path):
+    _, url = service
+    status, _ = request(f"{url}/grade?wait=1", make_tarball(),
+                        content_type="application/gzip")
+    assert status == 200
+    assert recorded_runs(tmp_path) == []
+
+    status, _ = request(f"{url}/grade?wait=1&repo=example/fork&commit=abc123",
+                        make_tarball(), content_type="application/gzip")
+    assert status == 200
+    assert recorded_runs(tmp_path) == [("example/fork", "abc123")]
+
+
+@pytest.mark.parametrize("length", ["-1", "abc"])
+def test_invalid_content_length_is_400(service, length):
+    _, url = service
+    conn = http.client.HTTPConnection(url[len("http://"):], timeout=10)
+    try:
+        conn.putrequest("POST", "/grade")
+        conn.putheader("Content-Type", "application/gzip")
+        conn.putheader("Content-Length", length)
+        conn.endheaders()
+        response = conn.getresponse()
+        assert response.status == 400
+        assert json.load(response) == {"error": "invalid Content-Length"}
+    finally:
+        conn.close()
+
+
+def test_tarball_with_unsafe_paths_is_rejected(service):
+    _, url = service
+    status, body = request(f"{url}/grade", make_tarball({"../evil.tf": b"x"}),
+                           content_type="application/gzip")
+    assert status == 400
+
+
+@pytest.mark.parametrize("body", [
+    {"path": REPO, "mode": "bad"},
+    {"path": REPO, "endpoints": "abc"},
+    {"path": REPO, "endpoints": [1, 2]},
+    {"path": "/no/such/dir"},
+    {"mode": "aws"},
+])
+def test_bad_requests_return_400(service, body):
+    _, url = service
+    status, response = request(f"{url}/grade", body)
+    assert status == 400
+    assert "error" in response
+
+
+def test_unknown_job_is_404(service):
+    _, url = service
+    assert request(f"{url}/jobs/nope")[0] == 404
+
+
+def test_full_queue_returns_503(tools, tmp_path):
+    service, server, url = start(tmp_path, workers=1, max_queue=1)
+    try:
+        # Live aws-mode verification runs the slow stub `terraform init`
+        slow = {"path": REPO, "verify": True, "mode": "aws",
+                "sandbox": False, "no_record": True}
+        status, first = request(f"{url}/grade", slow)
+        assert status == 202
+        status, body = request(f"{url}/grade", slow)
+        assert status == 503
+        assert service.wait(first["id"])["status"] == "done"
+        assert request(f"{url}/health")[1]["pending"] == 0
+        assert (tmp_path / "discovery.json").exists()
+    finally:
+        server.shutdown()
+        server.server_close()
+        service.shutdown()
+
+
+def test_pool_is_replaced_after_worker_dies(service):
+    service, url = service
+    assert request(f"{url}/grade?wait=1",
+                   {"path": REPO, "no_record": True})[1]["status"] == "done"
+    for pid in list(service.pool._processes):
+        os.kill(pid, signal.SIGKILL)
+    for _ in range(100):
+        if service.pool._broken:
+            break
+        time.sleep(0.05)
+
+    for _ in range(3):
+        status, job = request(f"{url}/grade?wait=1",
+                              {"path": REPO, "no_record": True})
+        assert (status, job["status"]) == (200, "done")
+    assert request(f"{url}/health")[1]["pending"] == 0
+
+
+def test_each_worker_gets_its_own_plugin_cache(tools, tmp_path):
+    service = run.GradingService(workers=2, plugin_cache=str(tmp_path / "plugins"))
+    try:
+        jobs = [service.submit(REPO, ["--no-record"]) for _ in range(4)]
+        for job_id in jobs:
+            assert service.wait(job_id)["status"] == "done"
+        assert sorted(os.listdir(tmp_path / "plugins")) == ["worker-0", "worker-1"]
+    finally:
+        service.shutdown()
+
+
+def test_finished_jobs_are_evicted(tools, tmp_path):
+    service = run.GradingService(workers=1, plugin_cache=str(tmp_path / "p"),
+                                 max_finished=2)
+    try:
+        jobs = [service.submit(REPO, ["--no-record"]) for _ in range(4)]
+        for job_id in jobs:
+            service.jobs[job_id]["_done"].wait()
+        assert [service.get(j) is not None for j in jobs] == \
+            [False, False, True, True]
+
+        service.job_ttl = 0
+        time.sleep(0.01)
+        service.submit(REPO, ["--no-record"])
+        assert all(service.get(j) is None for j in jobs)
+    finally:
+        service.shutdown()